@@ -1,15 +1,1020 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
 import time
 import os
 import subprocess
 import shutil
 import re
-import pandas as pd
+import sys
+import json
+import base64
+import hashlib
+import copy
+import uuid
+import contextlib
+import math
+import queue
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+import sqlite3
+import socket
+import csv
+import argparse
+import getpass
+import warnings
+import importlib
+import importlib.util
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs, parse_qsl, urlencode, quote
+
+
+# ==================== LAZY IMPORTS ====================
+class _LazyImport:
+    """Stand-in for a module (or one of its attributes) that is imported on first use.
+
+    Keeps ``import Combined_Web_Process`` cheap: selenium, requests, pandas, openpyxl,
+    pyarrow and cryptography are only loaded by the code paths that actually touch them.
+    """
+
+    def __init__(self, module: str, attr: str | None = None):
+        self._module = module
+        self._attr = attr
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            target = importlib.import_module(self._module)
+            self._target = getattr(target, self._attr) if self._attr else target
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        name = f"{self._module}.{self._attr}" if self._attr else self._module
+        return f"<lazy {name}{' (loaded)' if self._target is not None else ''}>"
+
+
+webdriver = _LazyImport("selenium.webdriver")
+By = _LazyImport("selenium.webdriver.common.by", "By")
+EC = _LazyImport("selenium.webdriver.support.expected_conditions")
+requests = _LazyImport("requests")
+HTTPAdapter = _LazyImport("requests.adapters", "HTTPAdapter")
+pd = _LazyImport("pandas")
+Workbook = _LazyImport("openpyxl", "Workbook")
+load_workbook = _LazyImport("openpyxl", "load_workbook")
+fernet = _LazyImport("cryptography.fernet")
+
+# Parquet conversion is optional; check for pyarrow without paying for its import
+HAVE_PYARROW = importlib.util.find_spec("pyarrow") is not None
+pa = _LazyImport("pyarrow")
+pq = _LazyImport("pyarrow.parquet")
+
+
+# ==================== DOWNLOAD WATCHER ====================
+class DownloadWatcher:
+    """Publish created/renamed/completed events for files appearing in a directory.
+
+    Uses inotify on Linux and falls back to diffing directory listings elsewhere.
+    Events are dicts with ``type``, ``name``, ``old_name``, ``path``, ``directory``
+    and ``time``.
+    """
+
+    TEMP_SUFFIXES = (".crdownload", ".tmp", ".part")
+
+    _IN_CLOSE_WRITE = 0x008
+    _IN_MOVED_FROM = 0x040
+    _IN_MOVED_TO = 0x080
+    _IN_CREATE = 0x100
+    _INOTIFY_EVENT = struct.Struct("iIII")
+
+    def __init__(self, directory: str, poll_interval: float = 0.5):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.backend = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def is_temp(cls, name: str) -> bool:
+        return name.endswith(cls.TEMP_SUFFIXES)
+
+    @classmethod
+    def final_name(cls, name: str) -> str:
+        for suffix in cls.TEMP_SUFFIXES:
+            if name.endswith(suffix):
+                return name[:-len(suffix)]
+        return name
+
+    def start(self):
+        # The watch (or the initial listing) is in place before start() returns,
+        # so anything that happens after a subscribe() is guaranteed to be seen.
+        fd = self._open_inotify()
+        if fd is not None:
+            self.backend = "inotify"
+            target, arg = self._inotify_loop, fd
+        else:
+            self.backend = "polling"
+            target, arg = self._poll_loop, set(os.listdir(self.directory))
+        self._thread = threading.Thread(target=target, args=(arg,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def subscribe(self, events: queue.Queue | None = None) -> queue.Queue:
+        events = events if events is not None else queue.Queue()
+        with self._lock:
+            self._subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events: queue.Queue):
+        with self._lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+
+    def _publish(self, event_type: str, name: str, old_name: str | None = None):
+        event = {
+            "type": event_type,
+            "name": name,
+            "old_name": old_name,
+            "path": os.path.join(self.directory, name),
+            "directory": self.directory,
+            "time": time.time(),
+        }
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            events.put(event)
+
+    def _renamed(self, old_name: str | None, name: str):
+        self._publish("renamed", name, old_name)
+        if not self.is_temp(name):
+            self._publish("completed", name, old_name)
+
+    def _open_inotify(self):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+            if fd < 0:
+                return None
+            mask = self._IN_CREATE | self._IN_MOVED_FROM | self._IN_MOVED_TO | self._IN_CLOSE_WRITE
+            if libc.inotify_add_watch(fd, os.fsencode(self.directory), mask) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def _inotify_loop(self, fd: int):
+        moved_from = {}
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd], [], [], self.poll_interval)
+                if not ready:
+                    continue
+                data = os.read(fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    _, mask, cookie, length = self._INOTIFY_EVENT.unpack_from(data, offset)
+                    offset += self._INOTIFY_EVENT.size
+                    name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                    offset += length
+                    if mask & self._IN_MOVED_FROM:
+                        moved_from[cookie] = name
+                    elif mask & self._IN_MOVED_TO:
+                        self._renamed(moved_from.pop(cookie, None), name)
+                    elif mask & self._IN_CREATE:
+                        self._publish("created", name)
+                    elif mask & self._IN_CLOSE_WRITE and not self.is_temp(name):
+                        self._publish("completed", name)
+        finally:
+            os.close(fd)
+
+    def _poll_loop(self, names: set):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                current = set(os.listdir(self.directory))
+            except OSError:
+                continue
+            added, removed = current - names, names - current
+            names = current
+            for name in sorted(added):
+                # Pair a vanished temp file with the name it was renamed to
+                old_name = next((r for r in removed if self.is_temp(r) and self.final_name(r) == name), None)
+                if old_name is None and len(added) == 1 and len(removed) == 1:
+                    old_name = next(iter(removed))
+                if old_name is not None:
+                    removed.discard(old_name)
+                    self._renamed(old_name, name)
+                else:
+                    self._publish("created", name)
+                    if not self.is_temp(name):
+                        self._publish("completed", name)
+
+
+# ==================== RUN TRACING ====================
+class RunTracer:
+    """Timed spans for the phases of a run, exported as JSON lines and a Prometheus textfile.
+
+    Every span records its phase, task label, duration, bytes downloaded and outcome.
+    Spans opened inside ``task()`` inherit the task's label and add their bytes to it.
+    """
+
+    def __init__(self, run_id: str | None = None):
+        # Automation runs pass their journal run id so traces join with the metrics store
+        self.run_id = run_id or f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def span(self, phase: str, label: str | None = None, **attrs):
+        task_record = getattr(self._local, "task_record", None)
+        record = {
+            "run_id": self.run_id,
+            "phase": phase,
+            "label": label or (task_record["label"] if task_record else None),
+            "start": time.time(),
+            "duration": None,
+            "bytes": 0,
+            "outcome": "ok",
+            **attrs,
+        }
+        started = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["outcome"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["duration"] = round(time.perf_counter() - started, 3)
+            if task_record is not None:
+                task_record["bytes"] += record["bytes"]
+            with self._lock:
+                self.spans.append(record)
+
+    @contextlib.contextmanager
+    def task(self, label: str):
+        with self.span("task", label) as record:
+            previous = getattr(self._local, "task_record", None)
+            self._local.task_record = record
+            try:
+                yield record
+            finally:
+                self._local.task_record = previous
+
+    def task_timings(self) -> list:
+        with self._lock:
+            return [span for span in self.spans if span["phase"] == "task"]
+
+    def export(self, directory: str, jsonl_name: str = "automation_trace.jsonl",
+               prom_name: str = "automation_metrics.prom"):
+        with self._lock:
+            spans = list(self.spans)
+
+        with open(os.path.join(directory, jsonl_name), "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, default=str) + "\n")
+
+        totals = {}
+        for span in spans:
+            key = (span["phase"], span["label"] or "")
+            duration, size, errors = totals.get(key, (0.0, 0, 0))
+            totals[key] = (duration + span["duration"], size + span["bytes"], errors + (span["outcome"] != "ok"))
+
+        def labels(phase, label):
+            label = label.replace("\\", "\\\\").replace('"', '\\"')
+            return f'{{phase="{phase}",label="{label}"}}'
+
+        lines = [
+            "# HELP automation_phase_duration_seconds Time spent per phase and task in the last run.",
+            "# TYPE automation_phase_duration_seconds gauge",
+            *(f"automation_phase_duration_seconds{labels(*key)} {value[0]:.3f}" for key, value in totals.items()),
+            "# HELP automation_phase_bytes Bytes downloaded per phase and task in the last run.",
+            "# TYPE automation_phase_bytes gauge",
+            *(f"automation_phase_bytes{labels(*key)} {value[1]}" for key, value in totals.items() if value[1]),
+            "# HELP automation_phase_errors Failed spans per phase and task in the last run.",
+            "# TYPE automation_phase_errors gauge",
+            *(f"automation_phase_errors{labels(*key)} {value[2]}" for key, value in totals.items()),
+            "# HELP automation_last_run_timestamp_seconds When the last run finished.",
+            "# TYPE automation_last_run_timestamp_seconds gauge",
+            f"automation_last_run_timestamp_seconds {time.time():.0f}",
+        ]
+        prom_path = os.path.join(directory, prom_name)
+        with open(prom_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(prom_path + ".tmp", prom_path)
+
+
+# ==================== ADAPTIVE WAITS ====================
+class AdaptiveWaits:
+    """Explicit waits with backoff polling whose timeouts follow the latencies seen per page.
+
+    Latency samples are kept per key (a page, question or download label) and persisted
+    to disk. Once enough samples exist, a key's timeout becomes a multiple of its p95
+    (never above the caller's worst-case default) and its poll interval grows toward a
+    tenth of its median, so fast pages are polled tightly and slow ones less often.
+    """
+
+    MIN_SAMPLES = 5
+    HISTORY = 50
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.samples = json.load(f)
+        except (OSError, ValueError):
+            self.samples = {}
+
+    @staticmethod
+    def _percentile(values: list, pct: float) -> float:
+        ordered = sorted(values)
+        return ordered[max(0, math.ceil(pct * len(ordered)) - 1)]
+
+    def timeout(self, key: str, default: float, floor: float = 10.0) -> float:
+        with self._lock:
+            history = list(self.samples.get(key, []))
+        if len(history) < self.MIN_SAMPLES:
+            return default
+        return min(default, max(floor, self._percentile(history, 0.95) * 3))
+
+    def poll_cap(self, key: str) -> float:
+        with self._lock:
+            history = list(self.samples.get(key, []))
+        if len(history) < self.MIN_SAMPLES:
+            return 1.0
+        return min(2.0, max(0.1, self._percentile(history, 0.5) / 10))
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            history = self.samples.setdefault(key, [])
+            history.append(round(seconds, 3))
+            del history[:-self.HISTORY]
+
+    def until(self, driver, condition, key: str, default_timeout: float):
+        """Poll condition(driver) with growing intervals until it returns something truthy"""
+        timeout = self.timeout(key, default_timeout)
+        cap = self.poll_cap(key)
+        interval = 0.05
+        started = time.monotonic()
+        end = started + timeout
+        while True:
+            try:
+                value = condition(driver)
+            except NoSuchElementException:
+                value = None
+            if value:
+                self.record(key, time.monotonic() - started)
+                return value
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                # Count the miss as a slow sample so a tightened timeout loosens again
+                self.record(key, timeout)
+                raise TimeoutException(f"{key} not ready after {timeout:.1f}s")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 1.5, cap)
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self.samples)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def probe_reachable(url: str, timeout: float = 60.0) -> bool:
+    """Poll url with growing intervals until any HTTP response comes back"""
+    interval = 0.25
+    end = time.monotonic() + timeout
+    while True:
+        try:
+            requests.head(url, timeout=min(3.0, max(0.5, end - time.monotonic())), allow_redirects=False)
+            return True
+        except requests.RequestException:
+            pass
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 1.6, 3.0)
+
+
+# ==================== SHARD MERGE ====================
+def iter_report_rows(path: str):
+    """Stream the rows of an xlsx or csv export, header first"""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.reader(f):
+                yield tuple(row)
+        return
+    wb = load_workbook(path, read_only=True)
+    try:
+        for row in wb.worksheets[0].iter_rows(values_only=True):
+            if any(value is not None for value in row):
+                yield row
+    finally:
+        wb.close()
+
+
+def merge_report_shards(shard_paths: list, output_path: str) -> dict:
+    """Concatenate shard exports row by row into one file under the first shard's header.
+
+    Returns the data row count of each shard with a digest of its rows, so callers
+    can tell a missing or duplicated shard apart from a legitimately empty one.
+    """
+    temp_path = f"{output_path}.merging"
+    csv_output = output_path.lower().endswith(".csv")
+    if csv_output:
+        out = open(temp_path, "w", newline="", encoding="utf-8")
+        append = csv.writer(out).writerow
+    else:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Query result")
+        append = ws.append
+
+    header, shards = None, []
+    try:
+        for path in shard_paths:
+            rows = iter_report_rows(path)
+            shard_header = next(rows, None)
+            if header is None:
+                header = shard_header
+                if header is not None:
+                    append(header)
+            elif shard_header is not None and shard_header != header:
+                raise ValueError(f"{os.path.basename(path)} has different columns than the first shard")
+            digest, count = hashlib.sha256(), 0
+            for row in rows:
+                append(row)
+                digest.update(repr(row).encode())
+                count += 1
+            shards.append({"path": path, "rows": count, "digest": digest.hexdigest()})
+        if not csv_output:
+            wb.save(temp_path)
+    finally:
+        if csv_output:
+            out.close()
+    os.replace(temp_path, output_path)
+    return {"rows": sum(shard["rows"] for shard in shards), "shards": shards}
+
+
+# ==================== PARQUET CONVERSION ====================
+def convert_to_parquet(source_path: str, parquet_path: str, batch_rows: int = 50_000) -> dict:
+    """Stream an xlsx or csv export into zstd-compressed Parquet, one row group per batch.
+
+    Column types are inferred from the first batch. A later batch may widen them: int64
+    columns become float64, and columns still empty take the first type they see (strings
+    if they never see one); the rows written so far are then rewritten under the wider
+    schema. Anything else that does not fit fails the conversion instead of being
+    truncated. Runs in a worker process.
+    """
+    rows = iter_report_rows(source_path)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("the file has no header row")
+    names, seen = [], set()
+    for index, name in enumerate(header):
+        name = str(name) if name is not None else f"column_{index + 1}"
+        while name in seen:
+            name += "_"
+        seen.add(name)
+        names.append(name)
+
+    temp_path, spare_path = f"{parquet_path}.writing", f"{parquet_path}.widening"
+    writer, schema, count, unset = None, None, 0, set()
+    try:
+        while True:
+            batch = [row for _, row in zip(range(batch_rows), rows)]
+            if schema is not None and not batch:
+                break
+            columns = [[row[i] if i < len(row) else None for row in batch] for i in range(len(names))]
+            if schema is None:
+                arrays = [pa.array(column) for column in columns]
+                unset = {i for i, a in enumerate(arrays) if pa.types.is_null(a.type)}
+                arrays = [a.cast(pa.string()) if i in unset else a for i, a in enumerate(arrays)]
+                schema = pa.schema([(name, a.type) for name, a in zip(names, arrays)])
+                writer = pq.ParquetWriter(temp_path, schema, compression="zstd")
+            else:
+                arrays = []
+                for field, column in zip(schema, columns):
+                    try:
+                        arrays.append(pa.array(column))
+                    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                        raise ValueError(f"Column {field.name!r} mixes types: {e}") from None
+                widened = _widen_schema(schema, arrays, unset)
+                if not widened.equals(schema):
+                    writer.close()
+                    writer = _rewrite_parquet(temp_path, spare_path, widened)
+                    temp_path, spare_path, schema = spare_path, temp_path, widened
+                for index, field in enumerate(schema):
+                    try:
+                        arrays[index] = arrays[index].cast(field.type)
+                    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+                        raise ValueError(f"Column {field.name!r} no longer fits {field.type}: {e}") from None
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(batch)
+            if len(batch) < batch_rows:
+                break
+        writer.close()
+    except BaseException:
+        # Leave no half-written Parquet behind
+        if writer:
+            with contextlib.suppress(Exception):
+                writer.close()
+        for path in (temp_path, spare_path):
+            with contextlib.suppress(OSError):
+                os.remove(path)
+        raise
+    os.replace(temp_path, parquet_path)
+    return {"path": parquet_path, "rows": count}
+
+
+def _widen_schema(schema, arrays: list, unset: set):
+    """Schema that also fits a new batch: int64 -> float64, and still-empty columns take the batch's type"""
+    fields = []
+    for index, (field, array) in enumerate(zip(schema, arrays)):
+        if pa.types.is_null(array.type):
+            fields.append(field)
+        elif index in unset:
+            # The first values a column sees settle its type, even when they are strings already
+            unset.discard(index)
+            fields.append(field.with_type(array.type))
+        elif array.type == field.type:
+            fields.append(field)
+        elif pa.types.is_integer(field.type) and pa.types.is_floating(array.type):
+            fields.append(field.with_type(pa.float64()))
+        else:
+            fields.append(field)
+    return pa.schema(fields)
+
+
+def _rewrite_parquet(source_path: str, target_path: str, schema):
+    """Copy a Parquet file under a wider schema, one row group at a time; returns the open writer"""
+    writer = pq.ParquetWriter(target_path, schema, compression="zstd")
+    with pq.ParquetFile(source_path) as source:
+        for index in range(source.num_row_groups):
+            writer.write_table(source.read_row_group(index).cast(schema))
+    os.remove(source_path)
+    return writer
+
+
+def postprocess_report(source_path: str, parquet_path: str | None = None) -> dict:
+    """Count a report's data rows, converting it to Parquet on the way when asked. Runs in a worker process."""
+    if parquet_path:
+        return convert_to_parquet(source_path, parquet_path)
+    rows = iter_report_rows(source_path)
+    # An empty file is not a report with -1 rows; failing here makes its verdict "unreadable"
+    if next(rows, None) is None:
+        raise ValueError("the file has no header row")
+    return {"path": None, "rows": sum(1 for _ in rows)}
+
+
+# ==================== REPORT CACHE ====================
+class ReportCache:
+    """Local store of exports for closed periods, keyed by (question URL, parameters, date range).
+
+    A JSON manifest records each entry's content hash, size and fetch time. Entries
+    older than the TTL are dropped, and the least recently used ones are evicted
+    once the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory: str, ttl: float = 90 * 86400, max_bytes: int = 2 * 1024 ** 3):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self._lock = threading.Lock()
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    @staticmethod
+    def key(url: str, start_date: str | None, end_date: str | None, fmt: str) -> str:
+        parts = urlsplit(url)
+        params = sorted(parse_qsl(parts.query))
+        identity = [f"{parts.netloc}{parts.path}", params, start_date, end_date, fmt]
+        return hashlib.sha256(json.dumps(identity).encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self.manifest.get(key)
+            if not entry:
+                return None
+            path = os.path.join(self.directory, entry["file"])
+            fresh = time.time() - entry["fetched_at"] < self.ttl
+            if not fresh or not os.path.isfile(path) or os.path.getsize(path) != entry["size"]:
+                self._drop(key)
+                self._save()
+                return None
+            entry["last_used"] = time.time()
+            self._save()
+            return path
+
+    def put(self, key: str, source_path: str, **info) -> str:
+        digest = hashlib.sha256()
+        with open(source_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        file_name = f"{key[:16]}{os.path.splitext(source_path)[1]}"
+        path = os.path.join(self.directory, file_name)
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            if os.path.exists(path):
+                os.remove(path)
+            try:
+                # A hard link costs no space; the rename of a later download replaces
+                # the output file's name, never this inode.
+                os.link(source_path, path)
+            except OSError:
+                shutil.copy2(source_path, path)
+            now = time.time()
+            self.manifest[key] = {
+                "file": file_name,
+                "sha256": digest.hexdigest(),
+                "size": os.path.getsize(path),
+                "fetched_at": now,
+                "last_used": now,
+                **info,
+            }
+            self._evict()
+            self._save()
+        return path
+
+    def _drop(self, key: str):
+        entry = self.manifest.pop(key, None)
+        if entry:
+            try:
+                os.remove(os.path.join(self.directory, entry["file"]))
+            except OSError:
+                pass
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, e in self.manifest.items() if now - e["fetched_at"] >= self.ttl]:
+            self._drop(key)
+        total = sum(e["size"] for e in self.manifest.values())
+        for key in sorted(self.manifest, key=lambda k: self.manifest[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self.manifest[key]["size"]
+            self._drop(key)
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+
+
+# ==================== TASK JOURNAL ====================
+class TaskJournal:
+    """Durable SQLite record of each run's task states, download handles and results.
+
+    Tasks move through pending, running, done and failed; download handles are
+    recorded when their directory is created, so a later process can adopt exports
+    that finished (or were still finishing) after the previous run died.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY, started_at REAL, finished_at REAL, task_ids TEXT);
+        CREATE TABLE IF NOT EXISTS tasks (
+            run_id TEXT, task_id TEXT, state TEXT, attempts INTEGER DEFAULT 0,
+            results TEXT, error TEXT, updated_at REAL, PRIMARY KEY (run_id, task_id));
+        CREATE TABLE IF NOT EXISTS downloads (
+            directory TEXT PRIMARY KEY, run_id TEXT, task_id TEXT, label TEXT,
+            state TEXT, path TEXT, updated_at REAL);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def start_run(self, task_ids: list, run_id: str | None = None) -> str:
+        """Open a new run, or reopen run_id and add any newly selected tasks to it"""
+        run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        now = time.time()
+        self._execute("INSERT INTO runs VALUES (?, ?, NULL, ?) ON CONFLICT(run_id) DO UPDATE "
+                      "SET finished_at = NULL, task_ids = excluded.task_ids", (run_id, now, json.dumps(task_ids)))
+        for task_id in task_ids:
+            self._execute("INSERT OR IGNORE INTO tasks (run_id, task_id, state, updated_at) VALUES (?, ?, 'pending', ?)",
+                          (run_id, task_id, now))
+        return run_id
+
+    def finish_run(self, run_id: str):
+        self._execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def unfinished_run(self) -> str | None:
+        """The latest run if it died or left tasks undone, else None"""
+        rows = self._execute("SELECT run_id, finished_at FROM runs ORDER BY started_at DESC LIMIT 1")
+        if not rows:
+            return None
+        run_id, finished_at = rows[0]
+        undone = self._execute("SELECT 1 FROM tasks WHERE run_id = ? AND state != 'done' LIMIT 1", (run_id,))
+        return run_id if finished_at is None or undone else None
+
+    def set_task(self, run_id: str, task_id: str, state: str, results: dict | None = None, error: str | None = None):
+        attempts = 1 if state == "running" else 0
+        self._execute("UPDATE tasks SET state = ?, attempts = attempts + ?, results = ?, error = ?, updated_at = ? "
+                      "WHERE run_id = ? AND task_id = ?",
+                      (state, attempts, json.dumps(results) if results is not None else None, error,
+                       time.time(), run_id, task_id))
+
+    def tasks(self, run_id: str) -> dict:
+        rows = self._execute("SELECT task_id, state, attempts, results, error FROM tasks WHERE run_id = ?", (run_id,))
+        return {task_id: {"state": state, "attempts": attempts, "error": error,
+                          "results": json.loads(results) if results else None}
+                for task_id, state, attempts, results, error in rows}
+
+    def record_download(self, run_id: str, task_id: str | None, label: str, directory: str):
+        self._execute("INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, 'started', NULL, ?)",
+                      (directory, run_id, task_id, label, time.time()))
+
+    def close_download(self, directory: str, state: str, path: str | None = None):
+        self._execute("UPDATE downloads SET state = ?, path = ?, updated_at = ? WHERE directory = ?",
+                      (state, path, time.time(), directory))
+
+    def open_downloads(self, run_id: str) -> list:
+        rows = self._execute("SELECT directory, task_id, label FROM downloads WHERE run_id = ? AND state = 'started'",
+                             (run_id,))
+        return [{"directory": d, "task_id": t, "label": l} for d, t, l in rows]
+
+    def completed_download(self, run_id: str, label: str) -> str | None:
+        rows = self._execute("SELECT path FROM downloads WHERE run_id = ? AND label = ? AND state = 'done' "
+                             "ORDER BY updated_at DESC LIMIT 1", (run_id, label))
+        return rows[0][0] if rows and rows[0][0] and os.path.isfile(rows[0][0]) else None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# ==================== METRICS STORE ====================
+class MetricsStore:
+    """Append-only SQLite history of every run's scraped values, downloads, row counts and verdicts.
+
+    One row per result: run id, task, metric, kind (scrape, download, rows, validation,
+    parquet), a numeric value or a text value, and the report period it covers.
+    Triggers reject updates and deletes, so past runs can only be added to.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS metrics (
+            run_id TEXT NOT NULL, recorded_at REAL NOT NULL, task_id TEXT, metric TEXT NOT NULL,
+            kind TEXT NOT NULL, value REAL, text TEXT, period_start TEXT, period_end TEXT);
+        CREATE INDEX IF NOT EXISTS metrics_series ON metrics (metric, kind, period_end);
+        CREATE INDEX IF NOT EXISTS metrics_run ON metrics (run_id);
+        CREATE TRIGGER IF NOT EXISTS metrics_no_update BEFORE UPDATE ON metrics
+            BEGIN SELECT RAISE(ABORT, 'metrics are append-only'); END;
+        CREATE TRIGGER IF NOT EXISTS metrics_no_delete BEFORE DELETE ON metrics
+            BEGIN SELECT RAISE(ABORT, 'metrics are append-only'); END;
+    """
+    COLUMNS = ("run_id", "recorded_at", "task_id", "metric", "kind", "value", "text", "period_start", "period_end")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(self.SCHEMA)
+
+    def append(self, records: list):
+        """Write one run's records in a single transaction"""
+        with self._lock, self._db:
+            self._db.executemany(f"INSERT INTO metrics VALUES ({', '.join('?' * len(self.COLUMNS))})", records)
+
+    def _query(self, sql: str, params: tuple = ()) -> "pd.DataFrame":
+        with self._lock:
+            return pd.read_sql_query(sql, self._db, params=params)
+
+    def last_run(self) -> str | None:
+        with self._lock:
+            row = self._db.execute("SELECT run_id FROM metrics ORDER BY recorded_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def run_records(self, run_id: str) -> "pd.DataFrame":
+        return self._query("SELECT * FROM metrics WHERE run_id = ? ORDER BY rowid", (run_id,))
+
+    def series(self, metric: str, kind: str = "scrape", since: str | None = None, until: str | None = None,
+               latest_per_period: bool = True) -> "pd.DataFrame":
+        """One metric over time, ordered by period; by default only the latest run of each period"""
+        sql = "SELECT period_start, period_end, value, text, run_id, recorded_at FROM metrics WHERE metric = ? AND kind = ?"
+        params = [metric, kind]
+        if since:
+            sql += " AND period_end >= ?"
+            params.append(since)
+        if until:
+            sql += " AND period_end <= ?"
+            params.append(until)
+        frame = self._query(sql + " ORDER BY period_end, recorded_at", tuple(params))
+        if latest_per_period:
+            frame = frame.drop_duplicates("period_end", keep="last").reset_index(drop=True)
+        return frame
+
+    def history(self, kind: str = "scrape", since: str | None = None) -> "pd.DataFrame":
+        """Every metric of one kind by period: one row per period end, one column per metric"""
+        sql = "SELECT metric, period_end, value FROM metrics WHERE kind = ?"
+        params = [kind]
+        if since:
+            sql += " AND period_end >= ?"
+            params.append(since)
+        frame = self._query(sql + " ORDER BY recorded_at", tuple(params))
+        if frame.empty:
+            return frame
+        return frame.pivot_table(index="period_end", columns="metric", values="value", aggfunc="last")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# ==================== TASK QUEUE ====================
+class TaskQueue:
+    """Lease-based task queue and result store in a SQLite file shared by a coordinator and its workers.
+
+    A worker claims one task at a time under a lease that it renews while the task runs.
+    When a lease runs out because its worker died or hung, the task goes back to the queue
+    until max_attempts claims have been used. The file keeps SQLite's rollback journal
+    rather than WAL, so it also works on a network share with working file locks.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS batches (
+            batch_id TEXT PRIMARY KEY, created_at REAL, start_date TEXT, end_date TEXT);
+        CREATE TABLE IF NOT EXISTS queue (
+            batch_id TEXT, task_id TEXT, position INTEGER, state TEXT, worker TEXT, lease_expires REAL,
+            attempts INTEGER DEFAULT 0, results TEXT, error TEXT, updated_at REAL,
+            PRIMARY KEY (batch_id, task_id));
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._db.executescript(self.SCHEMA)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two workers never claim the same row
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def submit(self, task_ids: list, start_date: str | None = None, end_date: str | None = None) -> str:
+        batch_id = datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("INSERT INTO batches VALUES (?, ?, ?, ?)", (batch_id, now, start_date, end_date))
+            db.executemany("INSERT INTO queue (batch_id, task_id, position, state, updated_at) "
+                           "VALUES (?, ?, ?, 'queued', ?)",
+                           [(batch_id, task_id, i, now) for i, task_id in enumerate(task_ids)])
+        return batch_id
+
+    def _expire(self, db, now: float):
+        db.execute("UPDATE queue SET state = 'failed', error = 'lease expired on every attempt', updated_at = ? "
+                   "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?", (now, now, self.max_attempts))
+
+    def claim(self, worker: str, lease: float) -> dict | None:
+        """Lease the oldest queued (or abandoned) task to worker; None when there is nothing to do"""
+        now = time.time()
+        with self._transaction() as db:
+            self._expire(db, now)
+            row = db.execute(
+                "SELECT q.batch_id, q.task_id, q.attempts, b.start_date, b.end_date FROM queue q "
+                "JOIN batches b USING (batch_id) "
+                "WHERE q.state = 'queued' OR (q.state = 'leased' AND q.lease_expires < ?) "
+                "ORDER BY b.created_at, q.position LIMIT 1", (now,)).fetchone()
+            if not row:
+                return None
+            batch_id, task_id, attempts, start_date, end_date = row
+            db.execute("UPDATE queue SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                       "updated_at = ? WHERE batch_id = ? AND task_id = ?",
+                       (worker, now + lease, now, batch_id, task_id))
+        return {"batch_id": batch_id, "task_id": task_id, "attempt": attempts + 1,
+                "start_date": start_date, "end_date": end_date}
+
+    def _update_owned(self, claimed: dict, worker: str, assignments: str, params: tuple) -> bool:
+        """Apply an update only while worker still holds the lease; False once it has been taken over"""
+        with self._transaction() as db:
+            cursor = db.execute(f"UPDATE queue SET {assignments}, updated_at = ? WHERE batch_id = ? AND task_id = ? "
+                                "AND worker = ? AND state = 'leased'",
+                                (*params, time.time(), claimed["batch_id"], claimed["task_id"], worker))
+            return cursor.rowcount == 1
+
+    def renew(self, claimed: dict, worker: str, lease: float) -> bool:
+        return self._update_owned(claimed, worker, "lease_expires = ?", (time.time() + lease,))
+
+    def complete(self, claimed: dict, worker: str, payload: dict) -> bool:
+        return self._update_owned(claimed, worker, "state = 'done', results = ?, error = NULL",
+                                  (json.dumps(payload, default=str),))
+
+    def fail(self, claimed: dict, worker: str, error: str) -> bool:
+        return self._update_owned(claimed, worker,
+                                  "state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, error = ?",
+                                  (self.max_attempts, error))
+
+    def cancel(self, batch_id: str):
+        with self._transaction() as db:
+            db.execute("UPDATE queue SET state = 'cancelled', updated_at = ? WHERE batch_id = ? AND state = 'queued'",
+                       (time.time(), batch_id))
+
+    def batch(self, batch_id: str) -> list:
+        with self._transaction() as db:
+            self._expire(db, time.time())
+            rows = db.execute("SELECT task_id, state, worker, attempts, results, error FROM queue "
+                              "WHERE batch_id = ? ORDER BY position", (batch_id,)).fetchall()
+        return [{"task_id": task_id, "state": state, "worker": worker, "attempts": attempts,
+                 "results": json.loads(results) if results else None, "error": error}
+                for task_id, state, worker, attempts, results, error in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# ==================== SESSION CACHE ====================
+class SessionCache:
+    """Encrypted on-disk store of a logged-in browser's cookies, keyed by login URL and login ID.
+
+    The encryption key is derived from the password, so changing the password
+    simply invalidates the stored session.
+    """
+
+    SESSION_COOKIE = "metabase.SESSION"
+
+    def __init__(self, directory: str, login_url: str, login_id: str, password: str,
+                 default_ttl: int = 12 * 3600):
+        key_id = hashlib.sha256(f"{login_url}\0{login_id}".encode()).hexdigest()[:32]
+        self.path = os.path.join(directory, f"session_{key_id}.bin")
+        self.default_ttl = default_ttl
+        key = hashlib.pbkdf2_hmac("sha256", password.encode(), key_id.encode(), 100_000)
+        self._fernet = fernet.Fernet(base64.urlsafe_b64encode(key))
+
+    def load(self) -> list | None:
+        """Return the stored cookies, or None when there is no unexpired session"""
+        try:
+            with open(self.path, "rb") as f:
+                payload = json.loads(self._fernet.decrypt(f.read()))
+        except (OSError, fernet.InvalidToken, ValueError):
+            return None
+        if payload["expires_at"] <= time.time():
+            self.clear()
+            return None
+        return payload["cookies"]
+
+    def save(self, cookies: list):
+        session = next((c for c in cookies if c["name"] == self.SESSION_COOKIE), None)
+        if session and "expiry" in session:
+            expires_at = session["expiry"]
+        else:
+            expires_at = time.time() + self.default_ttl
+        payload = json.dumps({"cookies": cookies, "expires_at": expires_at, "saved_at": time.time()})
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Pool workers share this cache and log in concurrently, so every save needs its own temp file
+        temp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(self._fernet.encrypt(payload.encode()))
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
 
 
 class UnifiedAutomation:
@@ -22,6 +1027,24 @@ class UnifiedAutomation:
         vpn_exe: str = r"C:\Program Files\OpenVPN Connect\OpenVPNConnect.exe",
         vpn_shortcut_id: str = "1752582150336",
         download_dir: str | None = None,
+        pool_size: int = 1,
+        export_engine: str = "browser",
+        task_engines: dict | None = None,
+        export_format: str = "xlsx",
+        session_cache: bool = True,
+        performance_profile: bool = False,
+        user_data_dir: str | None = None,
+        metabase_url: str = "https://metabase.caradvise.com",
+        report_cache: bool = True,
+        cache_ttl: float = 90 * 86400,
+        cache_max_bytes: int = 2 * 1024 ** 3,
+        force_refresh: bool = False,
+        max_retries: int = 2,
+        retry_backoff: float = 30.0,
+        shard_days: int | None = None,
+        parquet: bool = False,
+        postprocess_workers: int = 2,
+        validate: bool = True,
     ):
         self.login_url = login_url
         self.login_id = login_id
@@ -30,7 +1053,54 @@ class UnifiedAutomation:
         self.vpn_exe = vpn_exe
         self.vpn_shortcut_id = vpn_shortcut_id
         self.download_dir = download_dir or os.path.dirname(os.path.abspath(__file__))
+        self.output_dir = self.download_dir
+        self.pool_size = max(1, pool_size)
+        self.export_engine = export_engine
+        self.task_engines = task_engines or {}
+        self.export_format = export_format
+        self.current_engine = export_engine
         self.driver = None
+        self.http_session = None
+        self._http_executor = None
+        self.download_events = queue.Queue()
+        self._pending_downloads = {}
+        # Browser downloads are attributed from CDP events: report tab -> handle, download GUID -> handle
+        self._download_tabs = {}
+        self._download_guids = {}
+        self._held_download_events = []
+        self.session_cache = SessionCache(
+            os.path.join(self.download_dir, ".session"), login_url, login_id, password
+        ) if session_cache else None
+        self.performance_profile = performance_profile
+        self.user_data_dir = user_data_dir
+        self.tracer = RunTracer()
+        self.metabase_url = metabase_url.rstrip("/")
+        self.waits = AdaptiveWaits(os.path.join(self.download_dir, ".wait_latencies.json"))
+        self.report_cache = ReportCache(
+            os.path.join(self.download_dir, ".report_cache"), cache_ttl, cache_max_bytes
+        ) if report_cache else None
+        self.force_refresh = force_refresh
+        self.journal = TaskJournal(os.path.join(self.download_dir, ".task_journal.sqlite3"))
+        self.run_id = None
+        self.current_task_id = None
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.shard_days = shard_days
+        if parquet and not HAVE_PYARROW:
+            print("Warning: pyarrow is not installed; Parquet conversion is disabled.")
+        self.parquet = parquet and HAVE_PYARROW
+        self.postprocess_workers = postprocess_workers
+        self.validate = validate
+        self.validations = []
+        self._postprocess = None
+        self._postprocessing = {}
+        self._expected_rows = {}
+        self.period = None
+        self._sessions = []
+        self._driver_started = None
+        # When set, sessions a run had to open stay open for the next run (worker mode)
+        self.keep_sessions = False
+        self.metrics = MetricsStore(os.path.join(self.download_dir, "automation_metrics.sqlite3"))
 
     # ========== Helper Methods ==========
     def _vpn(self, action: str, wait: int = 0):
@@ -39,42 +1109,167 @@ class UnifiedAutomation:
         subprocess.Popen([self.vpn_exe, arg])
         if wait: time.sleep(wait)
 
+    def _start_vpn(self):
+        """Connect the VPN and return a future that resolves once the login URL answers"""
+        self._vpn("connect")
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(self._traced_vpn_wait)
+        executor.shutdown(wait=False)
+        return future
+
+    def _traced_vpn_wait(self):
+        with self.tracer.span("vpn_connect"):
+            self._wait_for_vpn()
+
+    def _wait_for_vpn(self, timeout: int = 60):
+        """Block until the login URL answers instead of sleeping a fixed time after connect"""
+        if not self.use_vpn: return
+        print("Waiting for VPN to come up…")
+        started = time.monotonic()
+        if probe_reachable(self.login_url, timeout):
+            print(f"VPN ready after {time.monotonic() - started:.1f}s.")
+        else:
+            print(f"Warning: {self.login_url} still unreachable after {timeout}s; continuing anyway.")
+
+    def _reconnect_vpn(self):
+        """Reconnect the VPN if the login URL stopped answering mid-run"""
+        if self.use_vpn and not probe_reachable(self.login_url, 5):
+            print("Login URL unreachable; reconnecting VPN…")
+            self._start_vpn().result()
+
+    # Requests the performance profile never lets through: images, web fonts and telemetry
+    _BLOCKED_URLS = [
+        "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico",
+        "*.woff", "*.woff2", "*.ttf", "*.otf",
+        "*google-analytics.com*", "*googletagmanager.com*", "*segment.io*", "*segment.com*",
+        "*sentry.io*", "*sp.metabase.com*", "*snowplow*",
+    ]
+
     def _make_driver(self, download_mode=False):
         chrome_opts = webdriver.ChromeOptions()
+        prefs = {}
         if download_mode:
-            prefs = {
+            prefs.update({
                 "download.default_directory": self.download_dir,
                 "download.prompt_for_download": False,
                 "download.directory_upgrade": True,
                 "safebrowsing.enabled": True,
                 "profile.default_content_settings.popups": 0
-            }
+            })
+            # Page.downloadWillBegin events in the performance log say which report tab started a download
+            chrome_opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+            chrome_opts.add_experimental_option("perfLoggingPrefs", {"enableNetwork": False, "enablePage": True})
+        if self.performance_profile:
+            chrome_opts.add_argument("--headless=new")
+            chrome_opts.add_argument("--window-size=1920,1080")
+            chrome_opts.page_load_strategy = "eager"
+            prefs["profile.managed_default_content_settings.images"] = 2
+        if self.user_data_dir:
+            # A persistent profile keeps Metabase's JS bundles in the disk cache between runs
+            chrome_opts.add_argument(f"--user-data-dir={self.user_data_dir}")
+        if prefs:
             chrome_opts.add_experimental_option("prefs", prefs)
+        # No implicit wait: every lookup that needs to wait does so explicitly
         self.driver = webdriver.Chrome(options=chrome_opts)
-        self.driver.implicitly_wait(5)
+        if self.performance_profile:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self._BLOCKED_URLS})
+        self._driver_started = time.time()
+
+    def _close_driver(self):
+        if self._http_executor:
+            self._http_executor.shutdown(wait=False, cancel_futures=True)
+            self._http_executor = None
+        if self.http_session:
+            self.http_session.close()
+            self.http_session = None
+        if self.driver:
+            self.driver.quit()
+            self.driver = None
+        self._discard_pending_downloads()
 
     def _login(self):
         d = self.driver
         print("Navigating to login page…")
         d.get(self.login_url)
-        WebDriverWait(d, 15).until(EC.presence_of_element_located((By.NAME, "username")))
+        self.waits.until(d, EC.presence_of_element_located((By.NAME, "username")), "login:form", 15)
         d.find_element(By.NAME, "username").send_keys(self.login_id)
         d.find_element(By.NAME, "password").send_keys(self.password)
         d.find_element(By.CSS_SELECTOR, "button[type='submit']").click()
         print("Submitting credentials…")
-        WebDriverWait(d, 15).until(EC.url_changes(self.login_url))
+        self.waits.until(d, EC.url_changes(self.login_url), "login:redirect", 15)
         print("Logged in successfully.")
 
+    # ========== Session Cache ==========
+    def _restore_session(self) -> bool:
+        """Load cached cookies into the fresh browser if one request confirms they are still valid"""
+        cookies = self.session_cache.load() if self.session_cache else None
+        if not cookies:
+            return False
+        if not self._session_is_valid(cookies):
+            print("Cached session has expired; logging in again.")
+            self.session_cache.clear()
+            return False
+        self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": [
+            {
+                "name": c["name"],
+                "value": c["value"],
+                "domain": c.get("domain"),
+                "path": c.get("path", "/"),
+                "secure": c.get("secure", False),
+                "httpOnly": c.get("httpOnly", False),
+                **({"expires": c["expiry"]} if "expiry" in c else {}),
+                **({"sameSite": c["sameSite"]} if c.get("sameSite") else {}),
+            }
+            for c in cookies
+        ]})
+        return True
+
+    def _session_is_valid(self, cookies: list) -> bool:
+        url = urlsplit(self.login_url)
+        jar = requests.cookies.RequestsCookieJar()
+        for c in cookies:
+            jar.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+        try:
+            response = requests.get(f"{url.scheme}://{url.netloc}/api/user/current", cookies=jar, timeout=10)
+        except requests.RequestException:
+            return False
+        return response.status_code == 200
+
+    def _ensure_login(self):
+        """Log in unless a valid cached session can be loaded into the browser"""
+        # Validating the cached session needs the network, so this runs after the VPN
+        # gate rather than inside _make_driver, which may start before the VPN is up.
+        if self._restore_session():
+            print("Reusing cached session; skipping login.")
+            return
+        self._login()
+        if self.session_cache:
+            self.session_cache.save(self.driver.get_cookies())
+
+    def _recover_session(self, download_mode: bool):
+        """Make sure the browser is alive and logged in before a retry, restarting it if not"""
+        try:
+            self.driver.current_url
+            self._ensure_login()
+        except Exception as e:
+            print(f"Browser session lost ({e}); restarting it…")
+            self._close_driver()
+            self._make_driver(download_mode=download_mode)
+            self._ensure_login()
+
     @staticmethod
     def _get_first_of_current_month() -> str:
         return datetime.now().replace(day=1).strftime("%Y-%m-%d")
 
+    def _report_period(self) -> tuple:
+        """Start and end dates of the download reports: the previous month unless the run overrides it"""
+        return self.period or self._get_previous_month_dates()
+
     @staticmethod
     def _get_previous_month_dates():
-        current_date = datetime.now()
-        previous_month_date = current_date - relativedelta(months=1)
-        start_date = previous_month_date.replace(day=1)
-        end_date = (start_date.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        end_date = datetime.now().replace(day=1) - timedelta(days=1)
+        start_date = end_date.replace(day=1)
         return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
 
     @staticmethod
@@ -86,7 +1281,7 @@ class UnifiedAutomation:
     # ========== Download Methods ==========
     def _start_report_download(self, base_url, label, start_date=None, end_date=None,
                                start_param="ApptStartDate", end_param="ApptEndDate",
-                               start_timeout=15):
+                               engine=None):
         d = self.driver
         
         # Build URL with dates if provided
@@ -94,431 +1289,1817 @@ class UnifiedAutomation:
             target = self._build_target_url(base_url, start_date, end_date, start_param, end_param)
         else:
             target = base_url
+
+        if (engine or self.current_engine) == "http":
+            return self._start_http_download(target, label)
             
+        # Each report gets its own tab: navigating away would cancel an export whose query is
+        # still running, and the tab identifies the download in Chrome's CDP events.
+        home = d.current_window_handle
+        d.switch_to.new_window("tab")
+        try:
+            return self._click_report_download(target, label, home)
+        except Exception:
+            d.close()
+            raise
+        finally:
+            d.switch_to.window(home)
+
+    def _click_report_download(self, target: str, label: str, home: str) -> dict:
+        d = self.driver
         print(f"[{label}] Opening report: {target}")
-        d.get(target)
+        with self.tracer.span("page_render", label):
+            d.get(target)
+            self.waits.until(d, EC.element_to_be_clickable((By.CSS_SELECTOR, "svg.Icon-download")),
+                             f"render:{urlsplit(target).path}", 60)
+            # The rendered result already states its row count; keep it to validate the file
+            shown = d.find_elements(By.XPATH, "//*[contains(text(), 'Showing') and contains(text(), 'row')]")
+            expected_rows = self._parse_row_count(shown[0].text) if shown else None
 
-        WebDriverWait(d, 60).until(EC.element_to_be_clickable((By.CSS_SELECTOR, "svg.Icon-download")))
-        d.find_element(By.CSS_SELECTOR, "svg.Icon-download").click()
+        with self.tracer.span("xlsx_menu", label):
+            d.find_element(By.CSS_SELECTOR, "svg.Icon-download").click()
 
-        # Wait specifically for XLSX button
-        print(f"[{label}] Looking for XLSX option...")
-        WebDriverWait(d, 10).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "button.text-white-hover.bg-brand-hover"))
-        )
-        buttons = d.find_elements(By.CSS_SELECTOR, "button.text-white-hover.bg-brand-hover")
-        xlsx_btn = None
-        for b in buttons:
-            try:
-                b.find_element(By.CSS_SELECTOR, "svg.Icon-xlsx")
-                xlsx_btn = b
-                break
-            except:
-                pass
-        if not xlsx_btn:
-            raise RuntimeError(f"[{label}] XLSX option not found.")
-
-        before = set(os.listdir(self.download_dir))
-        click_time = time.time()
-        xlsx_btn.click()
-        print(f"[{label}] XLSX download clicked.")
-
-        expected_final_name = None
-        final_path = None
-        t0 = time.time()
-        while time.time() - t0 < start_timeout:
-            after = set(os.listdir(self.download_dir))
-            new_files = list(after - before)
-            if new_files:
-                newest = max(new_files, key=lambda f: os.path.getmtime(os.path.join(self.download_dir, f)))
-                if newest.endswith(".crdownload"):
-                    expected_final_name = newest[:-len(".crdownload")]
-                    print(f"[{label}] Download started (temp): {newest} -> expecting {expected_final_name}")
-                    break
-                elif newest.endswith(".xlsx"):
-                    final_path = os.path.join(self.download_dir, newest)
-                    print(f"[{label}] Download completed quickly: {final_path}")
+            # Wait specifically for XLSX button
+            print(f"[{label}] Looking for XLSX option...")
+            self.waits.until(
+                d, EC.presence_of_all_elements_located((By.CSS_SELECTOR, "button.text-white-hover.bg-brand-hover")),
+                "xlsx_menu", 10,
+            )
+            buttons = d.find_elements(By.CSS_SELECTOR, "button.text-white-hover.bg-brand-hover")
+            xlsx_btn = None
+            for b in buttons:
+                try:
+                    b.find_element(By.CSS_SELECTOR, "svg.Icon-xlsx")
+                    xlsx_btn = b
                     break
-            time.sleep(0.5)
+                except:
+                    pass
+            if not xlsx_btn:
+                raise RuntimeError(f"[{label}] XLSX option not found.")
 
-        return {
+        with self.tracer.span("download_start", label):
+            handle = self._new_download_handle(label)
+            handle["tab"], handle["home"] = d.current_window_handle, home
+            self._download_tabs[handle["tab"]] = handle
+            if expected_rows:
+                self._expected_rows[label] = expected_rows
+            # Chrome fixes the directory when a download begins, so an export that starts late
+            # lands in a later report's directory; allowAndName saves it under its GUID, and the
+            # GUID is attributed to this handle from the tab's Page.downloadWillBegin event.
+            d.execute_cdp_cmd("Browser.setDownloadBehavior", {
+                "behavior": "allowAndName",
+                "downloadPath": handle["dir"],
+                "eventsEnabled": True,
+            })
+            handle["click_time"] = time.time()
+            xlsx_btn.click()
+            print(f"[{label}] XLSX download clicked.")
+        return handle
+
+    def _new_download_handle(self, label: str) -> dict:
+        """Create a download handle with its own GUID directory and watcher"""
+        guid = uuid.uuid4().hex
+        handle_dir = os.path.join(self.download_dir, ".downloads", guid)
+        os.makedirs(handle_dir)
+        watcher = DownloadWatcher(handle_dir).start()
+        watcher.subscribe(self.download_events)
+        handle = {
             "label": label,
-            "expected_final_name": expected_final_name,
-            "final_path": final_path,
-            "click_time": click_time
+            "guid": guid,
+            "dir": handle_dir,
+            "watcher": watcher,
+            "temp_name": None,
+            "expected_final_name": None,
+            "final_path": None,
+            "suggested_name": None,
+            "error": None,
+            "tab": None,
+            "click_time": None,
+            "completed_time": None,
         }
+        self._pending_downloads[handle_dir] = handle
+        if self.run_id:
+            self.journal.record_download(self.run_id, self.current_task_id, label, handle_dir)
+        return handle
 
-    def _wait_for_download(self, handle, timeout=300):
-        print(f"Waiting for download to complete...")
-        end = time.time() + timeout
-        
-        while time.time() < end:
-            expected = handle.get("expected_final_name")
-            if expected:
-                candidate = os.path.join(self.download_dir, expected)
-                if os.path.exists(candidate) and not os.path.exists(candidate + ".crdownload"):
-                    print(f"[{handle['label']}] Download complete: {candidate}")
-                    return candidate
-            
-            for f in os.listdir(self.download_dir):
-                if not f.endswith(".xlsx"):
-                    continue
-                path = os.path.join(self.download_dir, f)
-                if os.path.getmtime(path) >= handle["click_time"] - 1:
-                    if not os.path.exists(path + ".crdownload"):
-                        print(f"[{handle['label']}] Download complete: {path}")
-                        return path
-            
-            time.sleep(1)
-        
-        raise TimeoutError(f"Download timed out for {handle['label']}")
+    def _release_download(self, handle):
+        self._pending_downloads.pop(handle["dir"], None)
+        self._download_guids.pop(handle.get("guid_cdp"), None)
+        handle["watcher"].stop()
+        with contextlib.suppress(OSError):
+            os.rmdir(handle["dir"])
+        tab = handle.get("tab")
+        if tab and self._download_tabs.pop(tab, None) and self.driver:
+            # A download that has begun outlives its tab; one that has not is cancelled with it
+            with contextlib.suppress(WebDriverException):
+                self.driver.switch_to.window(tab)
+                self.driver.close()
+                self.driver.switch_to.window(handle["home"])
+
+    def _discard_pending_downloads(self):
+        for handle in list(self._pending_downloads.values()):
+            self._release_download(handle)
+
+    @staticmethod
+    def _apply_download_event(handle, event):
+        """Update a handle from an event raised in its own download directory"""
+        name = event["name"]
+        if event["type"] == "failed":
+            # Recorded rather than raised, so the other downloads of the batch still finish
+            handle["error"] = str(event["error"])
+        elif event["type"] in ("created", "renamed") and DownloadWatcher.is_temp(name):
+            handle["temp_name"] = name
+            handle["expected_final_name"] = DownloadWatcher.final_name(name)
+        elif event["type"] == "completed":
+            handle["expected_final_name"] = name
+            handle["final_path"] = event["path"]
+            handle["completed_time"] = event["time"]
+
+    def _pump_download_events(self, deadline: float) -> bool:
+        """Route the next watcher event to its handle; returns False once the deadline passes"""
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
+        try:
+            # Held browser events wait on Chrome's log, so look at it at least once a second
+            event = self.download_events.get(timeout=min(remaining, 1.0) if self._download_tabs else remaining)
+        except queue.Empty:
+            held, self._held_download_events = self._held_download_events, []
+            for event in held:
+                self._route_download_event(event)
+            return True
+        self._route_download_event(event)
+        return True
+
+    def _route_download_event(self, event):
+        handle = self._pending_downloads.get(event["directory"])
+        if handle and handle["tab"] and event["type"] != "failed":
+            # Browser downloads are named by GUID and may land in another report's directory
+            guid = DownloadWatcher.final_name(event["name"])
+            if guid not in self._download_guids:
+                self._read_download_log()
+            handle = self._download_guids.get(guid)
+            if handle is None:
+                self._held_download_events.append(event)
+                return
+        if handle and not (handle["final_path"] or handle["error"]):
+            self._apply_download_event(handle, event)
+
+    def _read_download_log(self):
+        """Attribute browser downloads to their report tabs from the CDP events in Chrome's performance log"""
+        for entry in self.driver.get_log("performance"):
+            message = json.loads(entry["message"])
+            method, params = message["message"].get("method"), message["message"].get("params", {})
+            if method == "Page.downloadWillBegin":
+                # Downloads from an iframe carry the iframe's id, but the log names the tab it came from
+                handle = self._download_tabs.get(params.get("frameId")) or self._download_tabs.get(message.get("webview"))
+                if handle and not handle.get("guid_cdp"):
+                    handle["guid_cdp"] = params["guid"]
+                    handle["suggested_name"] = params.get("suggestedFilename")
+                    self._download_guids[params["guid"]] = handle
+            elif method == "Page.downloadProgress" and params.get("state") == "canceled":
+                handle = self._download_guids.get(params.get("guid"))
+                if handle:
+                    self.download_events.put({"type": "failed", "name": None, "directory": handle["dir"],
+                                              "error": "Chrome cancelled the download"})
+
+    def _adopt_downloads(self, stale_after: float = 30.0):
+        """Collect the interrupted run's downloads: keep finished files, wait on ones still growing"""
+        for row in self.journal.open_downloads(self.run_id):
+            directory, label = row["directory"], row["label"]
+            path = self._settle_download(directory, stale_after) if os.path.isdir(directory) else None
+            if path:
+                print(f"[{label}] Recovered download from the interrupted run.")
+                self.journal.close_download(directory, "done", self._rename_downloaded_file(path, label))
+            else:
+                self.journal.close_download(directory, "abandoned")
+                shutil.rmtree(directory, ignore_errors=True)
+
+    @staticmethod
+    def _settle_download(directory: str, stale_after: float) -> str | None:
+        """Path of the finished file in a download directory, waiting while a temp file keeps growing"""
+        def scan():
+            names = os.listdir(directory)
+            finished = [n for n in names if not DownloadWatcher.is_temp(n)]
+            if finished:
+                return os.path.join(directory, finished[0]), 0
+            size = 0
+            for name in names:
+                with contextlib.suppress(OSError):
+                    size += os.path.getsize(os.path.join(directory, name))
+            return None, size if names else None
+
+        events = queue.Queue()
+        watcher = DownloadWatcher(directory).start()
+        watcher.subscribe(events)
+        try:
+            # A browser left running by the dead process may still be writing here
+            last_size, last_change = None, time.time()
+            while True:
+                path, size = scan()
+                if path or size is None:
+                    return path
+                if size != last_size:
+                    last_size, last_change = size, time.time()
+                elif time.time() - last_change > stale_after:
+                    return None
+                with contextlib.suppress(queue.Empty):
+                    event = events.get(timeout=5)
+                    if event["type"] == "completed":
+                        return event["path"]
+        finally:
+            watcher.stop()
 
-    def _rename_downloaded_file(self, original_path: str, label: str) -> str:
+    def _output_path(self, label: str, extension: str) -> str:
         clean_label = label.replace(" ", "_").replace("/", "-")
-        new_filename = f"{clean_label}.xlsx"
-        new_path = os.path.join(self.download_dir, new_filename)
-        
-        if os.path.exists(new_path):
-            counter = 1
-            while os.path.exists(new_path):
-                new_filename = f"{clean_label}_{counter}.xlsx"
-                new_path = os.path.join(self.download_dir, new_filename)
-                counter += 1
-        
+        return os.path.join(self.output_dir, f"{clean_label}{extension or '.xlsx'}")
+
+    def _rename_downloaded_file(self, original_path: str, label: str, name: str | None = None) -> str:
+        # Each download has its own name (its GUID for browser downloads, whose real
+        # name is passed in), so the move is a single atomic replace onto the label name.
+        new_path = self._output_path(label, os.path.splitext(name or original_path)[1])
+        new_filename = os.path.basename(new_path)
+
+        try:
+            os.replace(original_path, new_path)
+        except OSError:
+            try:
+                shutil.move(original_path, new_path)
+            except Exception as e:
+                print(f"[{label}] Warning: Could not rename file. Error: {e}")
+                return original_path
+        print(f"[{label}] Renamed file to: {new_filename}")
+        # A download directory still in use by another report stays until that report is released
+        if os.path.dirname(original_path) not in self._pending_downloads:
+            with contextlib.suppress(OSError):
+                os.rmdir(os.path.dirname(original_path))
+        return new_path
+
+    # ========== HTTP Export Engine ==========
+    def _http(self) -> "requests.Session":
+        """Pooled HTTP session that reuses the browser's authenticated Metabase cookies"""
+        if self.http_session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+            session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+            for cookie in self.driver.get_cookies():
+                session.cookies.set(cookie["name"], cookie["value"],
+                                    domain=cookie.get("domain"), path=cookie.get("path", "/"))
+                if cookie["name"] == "metabase.SESSION":
+                    session.headers["X-Metabase-Session"] = cookie["value"]
+            self.http_session = session
+        return self.http_session
+
+    def _start_http_download(self, target: str, label: str) -> dict:
+        handle = self._new_download_handle(label)
+        handle["click_time"] = time.time()
+        if self._http_executor is None:
+            self._http_executor = ThreadPoolExecutor(max_workers=4)
+        session = self._http()
+        print(f"[{label}] Exporting over HTTP: {target}")
+        handle["future"] = self._http_executor.submit(self._http_export, session, target, handle)
+        return handle
+
+    @staticmethod
+    def _export_parameters(card: dict, query: dict) -> list:
+        """Translate question URL query parameters into Metabase API parameter objects"""
+        declared = {p["slug"]: p for p in card.get("parameters") or [] if p.get("slug")}
+        template_tags = (card.get("dataset_query", {}).get("native") or {}).get("template-tags", {})
+        unmapped = sorted(slug for slug in query if slug not in declared and slug not in template_tags)
+        if unmapped:
+            # Dropping a filter would export (and cache) the unfiltered result under the report's name
+            raise ValueError(f"Card {card.get('id')} does not declare URL parameters: {', '.join(unmapped)}")
+        parameters = []
+        for slug, values in query.items():
+            if slug in declared:
+                p_type, p_target = declared[slug].get("type", "category"), declared[slug].get("target")
+            else:
+                tag = template_tags[slug]
+                p_type = "date/single" if tag.get("type") == "date" else "category"
+                kind = "dimension" if tag.get("type") == "dimension" else "variable"
+                p_target = [kind, ["template-tag", tag.get("name", slug)]]
+            value = values[0] if p_type.startswith("date") else values
+            parameters.append({"type": p_type, "target": p_target, "value": value})
+        return parameters
+
+    def _http_export(self, session: "requests.Session", target: str, handle: dict):
+        """Stream a question export into the handle directory; the watcher reports completion"""
+        with self.tracer.span("http_export", handle["label"]) as span:
+            self._http_export_to(session, target, handle, span)
+
+    def _http_export_to(self, session: "requests.Session", target: str, handle: dict, span: dict):
         try:
-            shutil.move(original_path, new_path)
-            print(f"[{label}] Renamed file to: {new_filename}")
-            return new_path
+            url = urlsplit(target)
+            base = f"{url.scheme}://{url.netloc}"
+            card_id = re.search(r"/question/(\d+)", url.path).group(1)
+            card = session.get(f"{base}/api/card/{card_id}", timeout=30)
+            card.raise_for_status()
+            parameters = self._export_parameters(card.json(), parse_qs(url.query))
+
+            export_url = f"{base}/api/card/{card_id}/query/{self.export_format}"
+            with session.post(export_url, data={"parameters": json.dumps(parameters)},
+                              stream=True, timeout=(30, 900)) as response:
+                response.raise_for_status()
+                disposition = response.headers.get("Content-Disposition", "")
+                match = re.search(r'filename="?([^";]+)"?', disposition)
+                name = os.path.basename(match.group(1)) if match else f"query_result.{self.export_format}"
+                temp_path = os.path.join(handle["dir"], name + ".part")
+                with open(temp_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
+                        span["bytes"] += len(chunk)
+            os.replace(temp_path, os.path.join(handle["dir"], name))
         except Exception as e:
-            print(f"[{label}] Warning: Could not rename file. Error: {e}")
-            return original_path
+            self.download_events.put({"type": "failed", "name": None, "directory": handle["dir"], "error": e})
+            raise
 
     def _wait_for_all_downloads(self, handles, timeout=300):
         print("Waiting for all downloads to complete…")
-        end = time.time() + timeout
-        results = {h["label"]: h.get("final_path") for h in handles}
-        assigned_files = set(os.path.basename(p) for p in results.values() if p)
+        end = max(h["click_time"] + self.waits.timeout(f"download:{h['label']}", timeout, floor=60) for h in handles)
+        with self.tracer.span("download_wait", files=len(handles)) as span:
+            try:
+                # Each file is renamed and handed to post-processing as soon as it lands,
+                # so a retry or resume only has to fetch the reports that are still missing
+                while True:
+                    for h in handles:
+                        if h["final_path"] and "output_path" not in h:
+                            span["bytes"] += self._finish_download(h)
+                    if all(h["final_path"] or h["error"] for h in handles) or not self._pump_download_events(end):
+                        break
+            finally:
+                for h in handles:
+                    self._release_download(h)
 
-        while time.time() < end:
             for h in handles:
-                label = h["label"]
-                if results[label]:
-                    continue
-
-                expected = h.get("expected_final_name")
-                if expected:
-                    candidate = os.path.join(self.download_dir, expected)
-                    if os.path.exists(candidate) and not os.path.exists(candidate + ".crdownload"):
-                        if os.path.basename(candidate) not in assigned_files:
-                            results[label] = candidate
-                            assigned_files.add(os.path.basename(candidate))
-                            print(f"[{label}] Finished: {candidate}")
-                            continue
-
-                for f in os.listdir(self.download_dir):
-                    if not f.endswith(".xlsx") or f in assigned_files:
-                        continue
-                    path = os.path.join(self.download_dir, f)
-                    if os.path.getmtime(path) >= h["click_time"] - 1:
-                        if not os.path.exists(path + ".crdownload"):
-                            results[label] = path
-                            assigned_files.add(f)
-                            print(f"[{label}] Finished (fallback): {path}")
-                            break
-
-            if all(results.values()):
-                any_cr = any(name.endswith(".crdownload") for name in os.listdir(self.download_dir))
-                if not any_cr:
-                    break
-
-            time.sleep(1)
+                if not h["error"]:
+                    finished = h["completed_time"] if h["final_path"] else end
+                    self.waits.record(f"download:{h['label']}", finished - h["click_time"])
+                if not h["final_path"]:
+                    self.journal.close_download(h["dir"], "failed")
 
-        unresolved = [lbl for lbl, p in results.items() if not p]
+        failed = [f"[{h['label']}] Download failed: {h['error']}" for h in handles if h["error"]]
+        unresolved = [h["label"] for h in handles if not (h["final_path"] or h["error"])]
         if unresolved:
-            raise TimeoutError(f"Timed out waiting for: {', '.join(unresolved)}")
+            failed.append(f"Timed out waiting for: {', '.join(unresolved)}")
+        if failed:
+            # Raised once every other download has landed; those are journaled and kept for the retry
+            error = TimeoutError if not any(h["error"] for h in handles) else RuntimeError
+            raise error("; ".join(failed))
+        return {h["label"]: h["output_path"] for h in handles}
 
-        # Rename all downloaded files
-        for h in handles:
-            label = h["label"]
-            if results[label]:
-                new_path = self._rename_downloaded_file(results[label], label)
-                results[label] = new_path
+    def _finish_download(self, handle) -> int:
+        """Rename a completed download into place, journal it and start its post-processing"""
+        label = handle["label"]
+        print(f"[{label}] Finished: {handle['final_path']}")
+        size = os.path.getsize(handle["final_path"])
+        handle["output_path"] = self._rename_downloaded_file(handle["final_path"], label, handle["suggested_name"])
+        self.journal.close_download(handle["dir"], "done", handle["output_path"])
+        report = handle.get("report")
+        if report:
+            self._store_report(report, handle["output_path"])
+        if not (report and report.get("shard_of")):
+            self._start_postprocess(label, handle["output_path"])
+        return size
+
+    def _start_postprocess(self, label: str, path: str):
+        """Count (and with parquet=True, convert) a finished report in the process pool while the run goes on"""
+        if not self._postprocess or label in self._postprocessing:
+            return
+        parquet_path = os.path.splitext(path)[0] + ".parquet" if self.parquet else None
+        if parquet_path and os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(path):
+            # Already converted by an earlier run, e.g. for a report served from the cache
+            future = Future()
+            future.set_result({"path": parquet_path, "rows": pq.ParquetFile(parquet_path).metadata.num_rows})
+        else:
+            future = self._postprocess.submit(postprocess_report, path, parquet_path)
+        self._postprocessing[label] = (path, future)
 
+    def _collect_postprocess(self) -> dict:
+        """Wait for pending post-processing; returns each report's row count, verdict and Parquet path"""
+        results = {}
+        for label, (path, future) in self._postprocessing.items():
+            try:
+                processed, error = future.result(), None
+            except Exception as e:
+                processed, error = {"path": None, "rows": None}, e
+            expected = self._expected_rows.get(label)
+            verdict = self._row_verdict(processed["rows"], expected, error)
+            if self.validate:
+                self.validations.append({
+                    "Report": label,
+                    "Path": path,
+                    "Rows": processed["rows"],
+                    "Expected Rows": f"{'at least ' if expected[1] else ''}{expected[0]}" if expected else None,
+                    "Verdict": verdict,
+                })
+                results[f"{label}_Validation"] = verdict
+                if verdict not in ("ok", "unchecked"):
+                    print(f"[{label}] Warning: validation {verdict}.")
+            elif error:
+                print(f"[{label}] Warning: Post-processing failed. Error: {error}")
+            if processed["rows"] is not None:
+                results[f"{label}_Rows"] = processed["rows"]
+            if processed["path"]:
+                results[f"{label}_Parquet"] = processed["path"]
+        self._postprocessing.clear()
         return results
-    
-    def save_results_to_excel(self, results, filename="automation_summary.xlsx"):
-        """Save scraped data to an Excel file"""
-        excel_path = os.path.join(self.download_dir, filename)
-        
-        # Prepare data for Excel - all in one list
-        all_data = []
-        
+
+    # Metabase stops every export at this many data rows
+    EXPORT_ROW_LIMIT = 1_048_575
+
+    @classmethod
+    def _row_verdict(cls, rows: int | None, expected: tuple | None, error: Exception | None = None) -> str:
+        """Judge a downloaded row count against the (count, is_lower_bound) the question page showed"""
+        if rows is None:
+            return f"unreadable: {error}"
+        if rows >= cls.EXPORT_ROW_LIMIT:
+            return "truncated at the export row limit"
+        if not expected:
+            return "unchecked"
+        count, lower_bound = expected
+        if rows < count:
+            return f"partial: {rows} of {count} rows"
+        if rows > count and not lower_bound:
+            return f"mismatch: {rows} rows, page showed {count}"
+        return "ok"
+
+    # Summary sheet type for each metric kind
+    _SUMMARY_TYPES = {
+        "download": "Downloaded File",
+        "scrape": "Scraped Data",
+        "rows": "Row Count",
+        "validation": "Validation",
+        "parquet": "Parquet File",
+        "other": "Other",
+    }
+    _RESULT_SUFFIXES = {"_Rows": "rows", "_Validation": "validation", "_Parquet": "parquet"}
+
+    def _record_metrics(self, run_id: str, results: dict, task_of: dict, period: tuple | None = None):
+        """Append a run's results to the metrics store, typed by the task that produced each one.
+
+        task_of maps each task's own result keys to its task id; the _Rows, _Validation
+        and _Parquet keys added by post-processing follow the key they extend.
+        """
+        tasks = self.tasks_config()
+        period_start, period_end = period or self._report_period()
+        recorded_at = time.time()
+        records = []
         for key, value in results.items():
-            # Check if it's a download task by looking for specific keywords in the key
-            if any(keyword in key for keyword in ['Report', 'Transactions', 'TV4', 'Enrollments', 'Memberships']) and isinstance(value, str) and '.xlsx' in value:
-                all_data.append({
-                    'Type': 'Downloaded File',
-                    'Name': key,
-                    'Value/Path': value,
-                    'Timestamp': datetime.now()
-                })
+            metric, task_id, kind = key, task_of.get(key), None
+            if task_id:
+                kind = "download" if tasks[task_id]["type"] == "download" else "scrape"
             else:
-                all_data.append({
-                    'Type': 'Scraped Data',
-                    'Name': key,
-                    'Value/Path': value,
-                    'Timestamp': datetime.now()
-                })
-        
-        # Create Excel with single sheet
-        df = pd.DataFrame(all_data)
-        df.to_excel(excel_path, sheet_name='Summary', index=False)
-        
-        print(f"\nSummary saved to: {excel_path}")
-        return excel_path
+                for suffix, suffix_kind in self._RESULT_SUFFIXES.items():
+                    if key.endswith(suffix) and key[:-len(suffix)] in task_of:
+                        metric, kind = key[:-len(suffix)], suffix_kind
+                        task_id = task_of[metric]
+                        break
+            numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+            records.append((run_id, recorded_at, task_id, metric, kind or "other",
+                            value if numeric else None, None if numeric or value is None else str(value),
+                            period_start, period_end))
+        if records:
+            self.metrics.append(records)
 
-    # ========== Task Implementations ==========
-    def instacart_downloads(self):
-        """Download all Instacart reports"""
-        start_date, end_date = self._get_previous_month_dates()
-        
-        reports = [
-            {"url": "https://metabase.caradvise.com/question/1499", "label": "TV4", 
-             "start_param": "ApptStartDate", "end_param": "ApptEndDate"},
-            {"url": "https://metabase.caradvise.com/question/1262", "label": "Instacart_Canada_Memberships",
-             "start_param": "ApptStartDate", "end_param": "ApptEndDate"},
-            {"url": "https://metabase.caradvise.com/question/1764?Affiliate=Instacart", "label": "Instacart_US_Enrollments",
-             "start_param": "EnrolledStart", "end_param": "EnrolledEnd"},
-            {"url": "https://metabase.caradvise.com/question/1764?Affiliate=Instacart%20Canada", "label": "Instacart_Canada_Enrollments",
-             "start_param": "EnrolledStart", "end_param": "EnrolledEnd"},
-        ]
-        
-        handles = []
-        for report in reports:
-            handle = self._start_report_download(
-                report["url"], report["label"], start_date, end_date,
-                report["start_param"], report["end_param"]
-            )
-            handles.append(handle)
-        
-        results = self._wait_for_all_downloads(handles, timeout=900)
-        return results
+    def save_results_to_excel(self, results: dict | None = None, filename="automation_summary.xlsx",
+                              run_id: str | None = None):
+        """Write the summary workbook of a run (the last one by default) as a view over the metrics store.
 
-    def clearcover_download(self):
-        """Download Clearcover report"""
-        handle = self._start_report_download("https://metabase.caradvise.com/question/1058", "Clearcover_Report")
-        downloaded_path = self._wait_for_download(handle)
-        renamed_path = self._rename_downloaded_file(downloaded_path, "Clearcover_Report")
-        return {"Clearcover_Report": renamed_path}
+        results is deprecated and ignored: the summary is read from the metrics store.
+        """
+        if results is not None:
+            warnings.warn("save_results_to_excel(results) is deprecated; the summary is read from the "
+                          "metrics store, so pass filename/run_id by keyword", DeprecationWarning, stacklevel=2)
+        excel_path = os.path.join(self.download_dir, filename)
+        run_id = run_id or self.run_id or self.metrics.last_run()
+        records = self.metrics.run_records(run_id) if run_id else pd.DataFrame(columns=MetricsStore.COLUMNS)
 
-    def grubhub_scrape(self):
-        """Scrape Grubhub Premium & Elite memberships"""
-        date_str = self._get_first_of_current_month()
-        dashboard_url = "https://metabase.caradvise.com/dashboard/58?id=723&id=1769&id=4509&id=4511&id=4512&id=4513"
-        target_url = f"{dashboard_url}&date_filter=~{date_str}"
-        
-        print(f"Navigating to dashboard: {target_url}")
-        self.driver.get(target_url)
+        summary = pd.DataFrame({
+            'Type': records["kind"].map(self._SUMMARY_TYPES),
+            'Task': records["task_id"],
+            'Name': records["metric"],
+            'Value/Path': records["value"].astype(object).where(records["value"].notna(), records["text"]),
+            'Period': records["period_start"] + " to " + records["period_end"],
+            'Timestamp': pd.to_datetime(records["recorded_at"], unit="s"),
+        })
 
-        results = {}
+        # Timings and validation exist in memory for the run this object just did
+        current = run_id == self.run_id
+        timings = [{
+            'Task': span['label'],
+            'Duration (s)': span['duration'],
+            'Bytes Downloaded': span['bytes'],
+            'Outcome': span['outcome'],
+        } for span in self.tracer.task_timings()] if current else []
+        history = self.metrics.history()
 
-        # Scrape Premium Memberships
-        premium_xpath = "//div[contains(@class, 'Card') and .//div[normalize-space()='Premium Memberships']]//h1[contains(@class, 'ScalarValue')]"
-        print("Waiting for the 'Premium Memberships' card to load...")
-        try:
-            value_element = WebDriverWait(self.driver, 45).until(
-                EC.visibility_of_element_located((By.XPATH, premium_xpath))
-            )
-            results["Grubhub_Premium_Memberships"] = int(value_element.text.replace(",", ""))
-        except:
-            results["Grubhub_Premium_Memberships"] = None
+        with pd.ExcelWriter(excel_path) as writer:
+            summary.to_excel(writer, sheet_name='Summary', index=False)
+            if timings:
+                pd.DataFrame(timings).to_excel(writer, sheet_name='Timings', index=False)
+            if current and self.validations:
+                pd.DataFrame(self.validations).to_excel(writer, sheet_name='Validation', index=False)
+            if not history.empty:
+                history.to_excel(writer, sheet_name='History')
+        
+        print(f"\nSummary saved to: {excel_path}")
+        return excel_path
 
-        # Scrape Elite Memberships
-        elite_xpath = "//div[contains(@class, 'Card') and .//div[normalize-space()='Elite Memberships']]//h1[contains(@class, 'ScalarValue')]"
-        try:
-            value_element = self.driver.find_element(By.XPATH, elite_xpath)
-            results["Grubhub_Elite_Memberships"] = int(value_element.text.replace(",", ""))
-        except:
-            results["Grubhub_Elite_Memberships"] = None
+    # ========== Dashboard Extraction ==========
+    # True once at least one scalar card has a value and no card is still loading
+    _DASHBOARD_READY_JS = """
+        const values = document.querySelectorAll("h1[class*='ScalarValue']");
+        const loading = document.querySelectorAll(".LoadingSpinner, [data-testid='loading-spinner']");
+        return loading.length === 0 && [...values].some(v => v.textContent.trim() !== "");
+    """
 
-        return results
+    # Map every card title to the text of its ScalarValue, innermost card first
+    _DASHBOARD_CARDS_JS = """
+        const norm = el => el.textContent.replace(/\\s+/g, " ").trim();
+        const pairs = {};
+        for (const value of document.querySelectorAll("h1[class*='ScalarValue']")) {
+            let card = value.closest("div[class*='Card']");
+            while (card) {
+                const titles = [...card.querySelectorAll("div")]
+                    .filter(div => !div.contains(value))
+                    .map(norm)
+                    .filter(title => title && title.length <= 200);
+                if (titles.length) {
+                    for (const title of titles) {
+                        if (!(title in pairs)) pairs[title] = norm(value);
+                    }
+                    break;
+                }
+                card = card.parentElement && card.parentElement.closest("div[class*='Card']");
+            }
+        }
+        return pairs;
+    """
 
-    def shipt_scrape(self):
-        """Scrape Shipt Premium & Elite memberships"""
-        date_str = self._get_first_of_current_month()
-        dashboard_url = "https://metabase.caradvise.com/dashboard/58?id=3966&id=3973&id=3969&id=3970&id=3972"
-        target_url = f"{dashboard_url}&date_filter=~{date_str}"
-        
-        print(f"Navigating to dashboard: {target_url}")
-        self.driver.get(target_url)
+    @staticmethod
+    def _parse_number(text):
+        if text is None:
+            return None
+        cleaned = text.replace(",", "").strip()
+        for cast in (int, float):
+            try:
+                return cast(cleaned)
+            except ValueError:
+                pass
+        return None
 
-        results = {}
+    # ========== Page Specs ==========
+    # A spec declares one page load: base URL, query params (in URL order), the
+    # extraction to run and the targets to read ({title: result_key}). Params named
+    # in merge_params only choose what the page shows, so specs that differ in
+    # nothing else can share a single load with the union of those values.
+    def _page_spec(self, url: str, targets: dict, extract: str = "cards",
+                   extra_params=(), merge_params=()) -> dict:
+        parts = urlsplit(url)
+        return {
+            "url": f"{parts.scheme}://{parts.netloc}{parts.path}",
+            "params": parse_qsl(parts.query) + list(extra_params),
+            "targets": dict(targets),
+            "extract": extract,
+            "merge_params": tuple(merge_params),
+        }
 
-        # Scrape Premium Memberships
-        premium_xpath = "//div[contains(@class, 'Card') and .//div[normalize-space()='Premium Memberships']]//h1[contains(@class, 'ScalarValue')]"
-        print("Waiting for the 'Premium Memberships' card to load...")
-        try:
-            value_element = WebDriverWait(self.driver, 45).until(
-                EC.visibility_of_element_located((By.XPATH, premium_xpath))
-            )
-            results["Shipt_Premium_Memberships"] = int(value_element.text.replace(",", ""))
-        except:
-            results["Shipt_Premium_Memberships"] = None
+    def _dashboard_spec(self, dashboard_url: str, cards: dict) -> dict:
+        # On dashboard 58 "id" is a dashboard filter: the same card titles read different
+        # values per id set, so ids must not be unioned across partners.
+        # The day after the report period, which is the first of this month by default
+        period_end = datetime.strptime(self._report_period()[1], "%Y-%m-%d")
+        date_str = (period_end + timedelta(days=1)).strftime("%Y-%m-%d")
+        return self._page_spec(dashboard_url, cards, extra_params=[("date_filter", f"~{date_str}")])
 
-        # Scrape Elite Memberships
-        elite_xpath = "//div[contains(@class, 'Card') and .//div[normalize-space()='Elite Memberships']]//h1[contains(@class, 'ScalarValue')]"
-        try:
-            value_element = self.driver.find_element(By.XPATH, elite_xpath)
-            results["Shipt_Elite_Memberships"] = int(value_element.text.replace(",", ""))
-        except:
-            results["Shipt_Elite_Memberships"] = None
+    @staticmethod
+    def _spec_url(spec: dict) -> str:
+        if not spec["params"]:
+            return spec["url"]
+        # parse_qsl decoded the values, so they are encoded again on the way out
+        return spec["url"] + "?" + urlencode(spec["params"], quote_via=quote)
 
-        return results
+    @staticmethod
+    def _spec_page_key(spec: dict) -> tuple:
+        fixed = sorted((k, v) for k, v in spec["params"] if k not in spec["merge_params"])
+        return spec["url"], spec["extract"], tuple(fixed), tuple(sorted(spec["merge_params"]))
 
-    def sunland_scrape(self):
-        """Scrape Sunland row count"""
-        target_url = "https://metabase.caradvise.com/question/909?ActiveOnly=1&FleetAffiliate=Sunland"
-        
+    @staticmethod
+    def _merge_specs(specs: list) -> dict:
+        merged = dict(specs[0], params=list(specs[0]["params"]), targets=dict(specs[0]["targets"]))
+        for spec in specs[1:]:
+            for param in spec["params"]:
+                if param[0] in spec["merge_params"] and param not in merged["params"]:
+                    merged["params"].append(param)
+            merged["targets"].update(spec["targets"])
+        return merged
+
+    def _scrape_page(self, spec: dict, timeout: int = 45) -> dict:
+        """Load the spec's page once and return {title: value} for its targets"""
+        target_url = self._spec_url(spec)
         print(f"Navigating to: {target_url}")
-        self.driver.get(target_url)
+        with self.tracer.span("page_render"):
+            self.driver.get(target_url)
+        key = f"page:{urlsplit(target_url).path}"
+        with self.tracer.span("extract"):
+            if spec["extract"] == "row_count":
+                return self._extract_row_count(timeout, key)
+            return self._extract_cards(timeout, key)
 
-        results = {}
+    def _scrape_spec(self, spec: dict) -> dict:
+        values = self._scrape_page(spec)
+        return {key: values.get(title) for title, key in spec["targets"].items()}
+
+    def _extract_cards(self, timeout: int, key: str) -> dict:
+        print(f"Waiting for the dashboard cards to load...")
+        try:
+            self.waits.until(self.driver, lambda d: d.execute_script(self._DASHBOARD_READY_JS), key, timeout)
+        except TimeoutException:
+            print("Dashboard did not finish loading; reading the cards that rendered.")
+
+        values = self.driver.execute_script(self._DASHBOARD_CARDS_JS) or {}
+        return {title: self._parse_number(text) for title, text in values.items()}
+
+    def _extract_row_count(self, timeout: int, key: str) -> dict:
         rows_xpath = "//span[contains(text(), 'Showing') and contains(text(), 'rows')]"
         
         print("Waiting for the row count to load...")
         try:
-            value_element = WebDriverWait(self.driver, 45).until(
-                EC.visibility_of_element_located((By.XPATH, rows_xpath))
+            value_element = self.waits.until(
+                self.driver, EC.visibility_of_element_located((By.XPATH, rows_xpath)), key, timeout
             )
-            full_text = value_element.text
-            match = re.search(r'Showing (\d+) rows', full_text)
-            if match:
-                results["Sunland_Row_Count"] = int(match.group(1))
-            else:
-                results["Sunland_Row_Count"] = None
+            shown = self._parse_row_count(value_element.text)
+            return {"rows": shown[0] if shown else None}
         except:
-            results["Sunland_Row_Count"] = None
+            return {"rows": None}
 
-        return results
+    @classmethod
+    def _parse_row_count(cls, text: str) -> tuple | None:
+        """Parse "Showing 1,234 rows" or "Showing first 2,000 rows" into (count, is_lower_bound)"""
+        match = re.search(r"Showing (first )?([\d,]+) rows?", text or "")
+        if not match:
+            return None
+        return cls._parse_number(match.group(2)), bool(match.group(1))
+
+    # ========== Report Downloads ==========
+    def _report_cache_key(self, report: dict) -> str | None:
+        """Cache key for a report whose date range has closed, else None"""
+        if not self.report_cache or not report.get("end_date") or report.get("shard_of"):
+            return None
+        if report["end_date"] >= self._get_first_of_current_month():
+            return None
+        fmt = self.export_format if self.current_engine == "http" else "xlsx"
+        return ReportCache.key(report["url"], report.get("start_date"), report["end_date"], fmt)
+
+    def _cached_report(self, report: dict) -> str | None:
+        key = self._report_cache_key(report)
+        if key is None or self.force_refresh:
+            return None
+        return self.report_cache.get(key)
+
+    def _restore_cached_report(self, label: str, cached_path: str) -> str:
+        """Place a cached export in the output directory under its label name"""
+        new_path = self._output_path(label, os.path.splitext(cached_path)[1])
+        if os.path.exists(new_path):
+            os.remove(new_path)
+        try:
+            os.link(cached_path, new_path)
+        except OSError:
+            shutil.copy2(cached_path, new_path)
+        print(f"[{label}] Using cached report: {os.path.basename(new_path)}")
+        return new_path
+
+    def _store_report(self, report: dict, path: str):
+        key = self._report_cache_key(report)
+        if key:
+            self.report_cache.put(key, path, label=report["label"], url=report["url"],
+                                  start_date=report.get("start_date"), end_date=report.get("end_date"))
+
+    def _reusable_report(self, report: dict) -> bool:
+        return bool(self.journal.completed_download(self.run_id, report["label"]) or self._cached_report(report))
+
+    def _reuse_report(self, report: dict) -> str | None:
+        """Output path of a report already downloaded in this run or held in the report cache"""
+        label = report["label"]
+        done = self.journal.completed_download(self.run_id, label)
+        if done:
+            print(f"[{label}] Already downloaded in this run: {os.path.basename(done)}")
+            if self._report_cache_key(report) not in (self.report_cache.manifest if self.report_cache else {}):
+                self._store_report(report, done)
+        else:
+            cached = self._cached_report(report)
+            if not cached:
+                return None
+            done = self._restore_cached_report(label, cached)
+        if not report.get("shard_of"):
+            self._start_postprocess(label, done)
+        return done
+
+    def _download_reports(self, reports: list, timeout: int = 300) -> dict:
+        """Download reports concurrently, skipping ones this run or the report cache already has"""
+        results, handles, sharded = {}, [], []
+        for report in reports:
+            reused = self._reuse_report(report)
+            if reused:
+                results[report["label"]] = reused
+                continue
+            parts = self._report_shards(report)
+            if len(parts) > 1:
+                sharded.append((report, parts))
+            for part in parts:
+                # A shard fetched before a retry or crash is not requested again
+                reused = self._reuse_report(part) if part is not report else None
+                if reused:
+                    results[part["label"]] = reused
+                    continue
+                handle = self._start_report_download(
+                    part["url"], part["label"], part.get("start_date"), part.get("end_date"),
+                    part.get("start_param", "ApptStartDate"), part.get("end_param", "ApptEndDate"),
+                )
+                handle["report"] = part
+                handles.append(handle)
+
+        if handles:
+            results.update(self._wait_for_all_downloads(handles, timeout=timeout))
+        for report, parts in sharded:
+            results[report["label"]] = self._merge_shards(report, parts, [results[p["label"]] for p in parts])
+        return {report["label"]: results[report["label"]] for report in reports}
+
+    def _report_shards(self, report: dict) -> list:
+        """Split a shardable report's date window into sub-reports of shard_days each"""
+        if not (self.shard_days and report.get("shard") and report.get("start_date") and report.get("end_date")):
+            return [report]
+        ranges = self._shard_ranges(report["start_date"], report["end_date"], self.shard_days)
+        return [dict(report, label=f"{report['label']}_part{i}", start_date=start, end_date=end,
+                     shard_of=report["label"])
+                for i, (start, end) in enumerate(ranges, 1)]
+
+    @staticmethod
+    def _shard_ranges(start_date: str, end_date: str, days: int) -> list:
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+        ranges = []
+        while start <= end:
+            stop = min(start + timedelta(days=days - 1), end)
+            ranges.append((start.strftime("%Y-%m-%d"), stop.strftime("%Y-%m-%d")))
+            start = stop + timedelta(days=1)
+        return ranges
+
+    def _merge_shards(self, report: dict, parts: list, paths: list) -> str:
+        """Stream the shard files into the report's output file and check nothing went missing"""
+        label = report["label"]
+        output_path = self._output_path(label, os.path.splitext(paths[0])[1])
+        with self.tracer.span("shard_merge", label, shards=len(paths)) as span:
+            merged = merge_report_shards(paths, output_path)
+            try:
+                self._verify_shards(report, parts, merged, output_path)
+            except RuntimeError:
+                # Never leave an incomplete merge under the report's name
+                os.remove(output_path)
+                raise
+            span["bytes"] = os.path.getsize(output_path)
+        print(f"[{label}] Merged {len(paths)} shards, {merged['rows']} rows: {os.path.basename(output_path)}")
+
+        for path in paths:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+        # The merged file has no download directory of its own, so its path keys the journal row
+        if self.run_id:
+            self.journal.record_download(self.run_id, self.current_task_id, label, output_path)
+            self.journal.close_download(output_path, "done", output_path)
+        self._store_report(report, output_path)
+        shown = [self._expected_rows.get(part["label"]) for part in parts]
+        if all(shown):
+            self._expected_rows[label] = (sum(c for c, _ in shown), any(lower for _, lower in shown))
+        self._start_postprocess(label, output_path)
+        return output_path
+
+    @staticmethod
+    def _verify_shards(report: dict, parts: list, merged: dict, output_path: str):
+        label = report["label"]
+        # The shard windows must tile the report's window exactly
+        expected = report["start_date"]
+        for part in parts:
+            if part["start_date"] != expected:
+                raise RuntimeError(f"[{label}] Shard windows leave a gap or overlap at {part['start_date']}")
+            following = datetime.strptime(part["end_date"], "%Y-%m-%d") + timedelta(days=1)
+            expected = following.strftime("%Y-%m-%d")
+        if parts[-1]["end_date"] != report["end_date"]:
+            raise RuntimeError(f"[{label}] Shards stop at {parts[-1]['end_date']}, not {report['end_date']}")
+
+        if len(merged["shards"]) != len(parts):
+            raise RuntimeError(f"[{label}] Merged {len(merged['shards'])} of {len(parts)} shards")
+        # Identical non-empty shards mean the date filter was ignored and a window came back twice
+        seen = {}
+        for part, shard in zip(parts, merged["shards"]):
+            if shard["rows"] and shard["digest"] in seen:
+                raise RuntimeError(f"[{label}] Shard {part['start_date']}..{part['end_date']} duplicates "
+                                   f"{seen[shard['digest']]}")
+            seen[shard["digest"]] = f"{part['start_date']}..{part['end_date']}"
+
+        written = sum(1 for _ in iter_report_rows(output_path)) - 1
+        if written != merged["rows"]:
+            raise RuntimeError(f"[{label}] Merged file has {written} rows, expected {merged['rows']}")
+
+    @staticmethod
+    def _results_intact(results: dict) -> bool:
+        return all(os.path.isfile(v) for v in results.values() if isinstance(v, str) and os.path.isabs(v))
+
+    def _resolve_offline(self, selected_tasks: list) -> tuple:
+        """Split off tasks that need no browser; returns (their results, remaining task ids).
+
+        Those are tasks the journal already has done for this run, and download tasks
+        whose every report was downloaded earlier in the run or sits in the report cache.
+        """
+        tasks = self.tasks_config()
+        journal = self.journal.tasks(self.run_id)
+        results, remaining = {}, []
+        for task_id in selected_tasks:
+            task, entry = tasks[task_id], journal.get(task_id, {})
+            if entry.get("state") == "done" and self._results_intact(entry["results"]):
+                print(f"{task['name']}: completed in the interrupted run; skipping.")
+                results.update(entry["results"])
+                continue
+            self.current_task_id = task_id
+            self.current_engine = self.task_engines.get(task_id, task.get("engine", self.export_engine))
+            reports = task["reports"]() if "reports" in task else []
+            if reports and all(self._reusable_report(report) for report in reports):
+                print(f"{task['name']}: all reports already available.")
+                task_results = self._download_reports(reports)
+                self.journal.set_task(self.run_id, task_id, "done", task_results)
+                results.update(task_results)
+            else:
+                remaining.append(task_id)
+        return results, remaining
+
+    # ========== Task Implementations ==========
+    def instacart_reports(self):
+        start_date, end_date = self._report_period()
+        return [
+            {"url": f"{self.metabase_url}/question/1499", "label": "TV4", 
+             "start_param": "ApptStartDate", "end_param": "ApptEndDate",
+             "start_date": start_date, "end_date": end_date, "shard": True},
+            {"url": f"{self.metabase_url}/question/1262", "label": "Instacart_Canada_Memberships",
+             "start_param": "ApptStartDate", "end_param": "ApptEndDate",
+             "start_date": start_date, "end_date": end_date},
+            {"url": f"{self.metabase_url}/question/1764?Affiliate=Instacart", "label": "Instacart_US_Enrollments",
+             "start_param": "EnrolledStart", "end_param": "EnrolledEnd",
+             "start_date": start_date, "end_date": end_date},
+            {"url": f"{self.metabase_url}/question/1764?Affiliate=Instacart%20Canada", "label": "Instacart_Canada_Enrollments",
+             "start_param": "EnrolledStart", "end_param": "EnrolledEnd",
+             "start_date": start_date, "end_date": end_date},
+        ]
+
+    def instacart_downloads(self):
+        """Download all Instacart reports"""
+        return self._download_reports(self.instacart_reports(), timeout=900)
+
+    def clearcover_reports(self):
+        return [{"url": f"{self.metabase_url}/question/1058", "label": "Clearcover_Report"}]
+
+    def clearcover_download(self):
+        """Download Clearcover report"""
+        return self._download_reports(self.clearcover_reports())
+
+    def grubhub_spec(self):
+        return self._dashboard_spec(
+            f"{self.metabase_url}/dashboard/58?id=723&id=1769&id=4509&id=4511&id=4512&id=4513",
+            {"Premium Memberships": "Grubhub_Premium_Memberships",
+             "Elite Memberships": "Grubhub_Elite_Memberships"},
+        )
+
+    def grubhub_scrape(self):
+        """Scrape Grubhub Premium & Elite memberships"""
+        return self._scrape_spec(self.grubhub_spec())
+
+    def shipt_spec(self):
+        return self._dashboard_spec(
+            f"{self.metabase_url}/dashboard/58?id=3966&id=3973&id=3969&id=3970&id=3972",
+            {"Premium Memberships": "Shipt_Premium_Memberships",
+             "Elite Memberships": "Shipt_Elite_Memberships"},
+        )
+
+    def shipt_scrape(self):
+        """Scrape Shipt Premium & Elite memberships"""
+        return self._scrape_spec(self.shipt_spec())
+
+    def sunland_spec(self):
+        return self._page_spec(
+            f"{self.metabase_url}/question/909?ActiveOnly=1&FleetAffiliate=Sunland",
+            {"rows": "Sunland_Row_Count"},
+            extract="row_count",
+        )
+
+    def sunland_scrape(self):
+        """Scrape Sunland row count"""
+        return self._scrape_spec(self.sunland_spec())
+
+    def sunland_reports(self):
+        start_date, end_date = self._report_period()
+        return [{"url": f"{self.metabase_url}/question/1276", "label": "Sunland_Transactions",
+                 "start_date": start_date, "end_date": end_date, "shard": True}]
 
     def sunland_download(self):
         """Download Sunland transactions report"""
-        start_date, end_date = self._get_previous_month_dates()
-        handle = self._start_report_download(
-            "https://metabase.caradvise.com/question/1276", 
-            "Sunland_Transactions", 
-            start_date, 
-            end_date
+        return self._download_reports(self.sunland_reports())
+
+    def uber_spec(self):
+        return self._dashboard_spec(
+            f"{self.metabase_url}/dashboard/58?id=485&id=486&id=487&id=488",
+            {"Paid Memberships": "Uber_Paid_Memberships"},
         )
-        downloaded_path = self._wait_for_download(handle)
-        renamed_path = self._rename_downloaded_file(downloaded_path, "Sunland_Transactions")
-        return {"Sunland_Transactions": renamed_path}
 
     def uber_scrape(self):
         """Scrape Uber Paid Memberships"""
-        date_str = self._get_first_of_current_month()
-        dashboard_url = "https://metabase.caradvise.com/dashboard/58?id=485&id=486&id=487&id=488"
-        target_url = f"{dashboard_url}&date_filter=~{date_str}"
-        
-        print(f"Navigating to dashboard: {target_url}")
-        self.driver.get(target_url)
+        return self._scrape_spec(self.uber_spec())
 
-        results = {}
-        paid_xpath = "//div[contains(@class, 'Card') and .//div[normalize-space()='Paid Memberships']]//h1[contains(@class, 'ScalarValue')]"
-        
-        print("Waiting for the 'Paid Memberships' card to load...")
+    # ========== Task Configuration ==========
+    # Task ids and menu names; listing them needs no instance (and no journal or metrics files)
+    TASK_NAMES = {
+        "1": "Instacart - Download All Reports",
+        "2": "Clearcover - Download Report",
+        "3": "Grubhub - Scrape Memberships",
+        "4": "Shipt - Scrape Memberships",
+        "5": "Sunland - Scrape Row Count",
+        "6": "Sunland - Download Transactions",
+        "7": "Uber - Scrape Paid Memberships",
+    }
+
+    def tasks_config(self):
+        return {
+            "1": {"name": self.TASK_NAMES["1"], "method": self.instacart_downloads, "type": "download",
+                  "reports": self.instacart_reports},
+            "2": {"name": self.TASK_NAMES["2"], "method": self.clearcover_download, "type": "download",
+                  "reports": self.clearcover_reports},
+            "3": {"name": self.TASK_NAMES["3"], "method": self.grubhub_scrape, "type": "scrape",
+                  "spec": self.grubhub_spec},
+            "4": {"name": self.TASK_NAMES["4"], "method": self.shipt_scrape, "type": "scrape",
+                  "spec": self.shipt_spec},
+            "5": {"name": self.TASK_NAMES["5"], "method": self.sunland_scrape, "type": "scrape",
+                  "spec": self.sunland_spec},
+            "6": {"name": self.TASK_NAMES["6"], "method": self.sunland_download, "type": "download",
+                  "reports": self.sunland_reports},
+            "7": {"name": self.TASK_NAMES["7"], "method": self.uber_scrape, "type": "scrape",
+                  "spec": self.uber_spec},
+        }
+
+    # ========== Task Planner ==========
+    def _plan(self, selected_tasks: list) -> list:
+        """Turn selected task ids into steps, one page load per step where specs allow sharing"""
+        tasks = self.tasks_config()
+        steps, shared = [], {}
+        for task_id in selected_tasks:
+            task = tasks[task_id]
+            if "spec" not in task:
+                steps.append({"task_ids": [task_id], "specs": {}, "group": task_id})
+                continue
+            spec = task["spec"]()
+            key = self._spec_page_key(spec)
+            if key in shared:
+                shared[key]["task_ids"].append(task_id)
+                shared[key]["specs"][task_id] = spec
+                continue
+            step = {"task_ids": [task_id], "specs": {task_id: spec}, "group": spec["url"]}
+            shared[key] = step
+            steps.append(step)
+
+        # Keep steps that hit the same page or question next to each other,
+        # in the order their group was first selected
+        first_seen = {}
+        for index, step in enumerate(steps):
+            first_seen.setdefault(self._plan_family(step["group"]), index)
+        steps.sort(key=lambda step: first_seen[self._plan_family(step["group"])])
+        return steps
+
+    @staticmethod
+    def _plan_family(group: str) -> str:
+        match = re.search(r"/(dashboard|question)/\d+", group)
+        if match and match.group(1) == "dashboard":
+            return match.group(0)
+        return group
+
+    def _execute_step(self, step: dict) -> dict:
+        """Execute one step, journaling its tasks; a failure is marked on the step for retry"""
+        tasks = self.tasks_config()
+        names = ", ".join(tasks[task_id]["name"] for task_id in step["task_ids"])
+        print(f"\n--- Executing: {names} ---")
+        for task_id in step["task_ids"]:
+            self.journal.set_task(self.run_id, task_id, "running")
         try:
-            value_element = WebDriverWait(self.driver, 45).until(
-                EC.visibility_of_element_located((By.XPATH, paid_xpath))
-            )
-            results["Uber_Paid_Memberships"] = int(value_element.text.replace(",", ""))
-        except:
-            results["Uber_Paid_Memberships"] = None
+            with self.tracer.task(names):
+                task_results = self._run_step(step)
+        except Exception as e:
+            print(f"Error in {names}: {e}")
+            step["error"] = str(e)
+            for task_id in step["task_ids"]:
+                self.journal.set_task(self.run_id, task_id, "failed", error=str(e))
+            # Continue with other tasks
+            return {}
+        finally:
+            self._discard_pending_downloads()
 
+        results = {}
+        for task_id, values in task_results.items():
+            self.journal.set_task(self.run_id, task_id, "done", values)
+            results.update(values)
         return results
 
-    # ========== Task Configuration ==========
-    def tasks_config(self):
-        return {
-            "1": {"name": "Instacart - Download All Reports", "method": self.instacart_downloads, "type": "download"},
-            "2": {"name": "Clearcover - Download Report", "method": self.clearcover_download, "type": "download"},
-            "3": {"name": "Grubhub - Scrape Memberships", "method": self.grubhub_scrape, "type": "scrape"},
-            "4": {"name": "Shipt - Scrape Memberships", "method": self.shipt_scrape, "type": "scrape"},
-            "5": {"name": "Sunland - Scrape Row Count", "method": self.sunland_scrape, "type": "scrape"},
-            "6": {"name": "Sunland - Download Transactions", "method": self.sunland_download, "type": "download"},
-            "7": {"name": "Uber - Scrape Paid Memberships", "method": self.uber_scrape, "type": "scrape"},
+    def _run_step(self, step: dict) -> dict:
+        """Results of one step keyed by task id"""
+        if not step["specs"]:
+            task_id = step["task_ids"][0]
+            task = self.tasks_config()[task_id]
+            self.current_task_id = task_id
+            self.current_engine = self.task_engines.get(task_id, task.get("engine", self.export_engine))
+            return {task_id: task["method"]()}
+
+        values = self._scrape_page(self._merge_specs(list(step["specs"].values())))
+        # Fan the shared page's values back out to each task's own result keys
+        return {task_id: {key: values.get(title) for title, key in spec["targets"].items()}
+                for task_id, spec in step["specs"].items()}
+
+    def _with_retries(self, steps: list, execute, recover) -> dict:
+        """Execute steps, then retry only the failed ones with exponential backoff"""
+        all_results = {}
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                print(f"\nRetrying {len(steps)} failed step(s) in {delay:.0f}s "
+                      f"(attempt {attempt + 1} of {self.max_retries + 1})…")
+                time.sleep(delay)
+                try:
+                    self._reconnect_vpn()
+                    recover()
+                except Exception as e:
+                    # The failed steps stay failed; the results so far still go back to run()
+                    print(f"Could not restore the session for the retry: {e}")
+                    continue
+            for step in steps:
+                step.pop("error", None)
+            all_results.update(execute(steps))
+            steps = [step for step in steps if "error" in step]
+            if not steps:
+                break
+        return all_results
+
+    def _spawn_worker(self, index: int) -> "UnifiedAutomation":
+        """Clone this automation into a pool worker with its own download directory"""
+        worker = copy.copy(self)
+        worker.driver = None
+        worker.download_events = queue.Queue()
+        worker._pending_downloads = {}
+        worker._download_tabs = {}
+        worker._download_guids = {}
+        worker._held_download_events = []
+        worker.http_session = None
+        worker._http_executor = None
+        if self.user_data_dir:
+            # Chrome locks a profile directory, so every pooled browser needs its own
+            worker.user_data_dir = f"{self.user_data_dir}_{index}"
+        worker.download_dir = os.path.join(self.download_dir, f"worker_{index}")
+        os.makedirs(worker.download_dir, exist_ok=True)
+        return worker
+
+    def _start_pool(self, size: int, download_mode: bool, vpn_ready) -> list:
+        def start(index):
+            worker = self._spawn_worker(index)
+            try:
+                with self.tracer.span("driver_start", f"worker_{index}"):
+                    worker._make_driver(download_mode=download_mode)
+                vpn_ready.result()
+                with self.tracer.span("login", f"worker_{index}"):
+                    worker._ensure_login()
+            except Exception:
+                worker._close_driver()
+                raise
+            return worker
+
+        print(f"Starting {size} browser sessions…")
+        workers = []
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            for future in [executor.submit(start, i) for i in range(size)]:
+                try:
+                    workers.append(future.result())
+                except Exception as e:
+                    print(f"Could not start browser session: {e}")
+        if not workers:
+            raise RuntimeError("No browser session could be started.")
+        return workers
+
+    # ========== Session Lifecycle ==========
+    def start(self, download_mode: bool = True, size: int | None = None):
+        """Connect the VPN and open logged-in browser sessions that stay up until close()"""
+        if self._sessions:
+            return
+        size = size or self.pool_size
+        # Chrome does not need the VPN to start, so browsers launch while it connects
+        # and only the first navigation (login or session check) waits for it.
+        vpn_ready = self._start_vpn()
+        try:
+            if size > 1:
+                self._sessions = self._start_pool(size, download_mode, vpn_ready)
+                return
+            with self.tracer.span("driver_start"):
+                self._make_driver(download_mode=download_mode)
+            vpn_ready.result()
+            with self.tracer.span("login"):
+                self._ensure_login()
+            self._sessions = [self]
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        """Close every browser session and disconnect the VPN"""
+        if self.driver or len(self._sessions) > 1:
+            print("\nClosing browsers…" if len(self._sessions) > 1 else "\nClosing browser…")
+        for session in self._sessions:
+            if session is not self:
+                session._close_driver()
+        self._sessions = []
+        self._close_driver()
+        self._vpn("disconnect")
+
+    # Per-run state that pool sessions, copied when the pool started, must follow
+    _RUN_STATE = ("run_id", "tracer", "period", "_postprocess")
+
+    def _sync_sessions(self):
+        for session in self._sessions:
+            for name in self._RUN_STATE:
+                setattr(session, name, getattr(self, name))
+
+    def _execute_steps(self, steps: list, download_mode: bool) -> dict:
+        """Execute planned steps on the open sessions, retrying the ones that fail"""
+        self._sync_sessions()
+        sessions = self._sessions
+        if len(sessions) == 1:
+            def execute(steps):
+                results = {}
+                for step in steps:
+                    results.update(sessions[0]._execute_step(step))
+                return results
+        else:
+            idle = queue.Queue()
+            for session in sessions:
+                idle.put(session)
+
+            def execute_step(step):
+                session = idle.get()
+                try:
+                    return session._execute_step(step)
+                finally:
+                    idle.put(session)
+
+            def execute(steps):
+                results = {}
+                with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+                    for step_results in executor.map(execute_step, steps):
+                        results.update(step_results)
+                return results
+
+        def recover():
+            for session in sessions:
+                session._recover_session(download_mode)
+
+        return self._with_retries(steps, execute, recover)
+
+    def check_sessions(self, max_age: float | None = None) -> list:
+        """Recycle open sessions that stopped responding, lost their login or outlived max_age"""
+        self._reconnect_vpn()
+        report = []
+        for index, session in enumerate(self._sessions):
+            reason = None
+            if max_age and time.time() - session._driver_started > max_age:
+                reason = f"older than {max_age / 3600:g}h"
+            else:
+                try:
+                    if not session._session_is_valid(session.driver.get_cookies()):
+                        reason = "logged out"
+                except Exception as e:
+                    reason = f"unresponsive ({type(e).__name__})"
+            if reason:
+                print(f"Recycling browser session {index}: {reason}")
+                session._close_driver()
+                session._make_driver(download_mode=True)
+                session._ensure_login()
+            report.append({"session": index, "recycled": reason,
+                           "age_s": round(time.time() - session._driver_started, 1)})
+        return report
+
+    # ========== Distributed Runner ==========
+    def work(self, queue_path: str, worker_id: str | None = None, lease: float = 300,
+             idle_exit: float | None = None, max_session_age: float = 4 * 3600):
+        """Claim tasks from a shared TaskQueue and run them on this machine's warm browser.
+
+        Runs until interrupted, or until no task has come in for idle_exit seconds.
+        """
+        task_queue = TaskQueue(queue_path)
+        worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        print(f"[worker {worker_id}] Waiting for tasks in {queue_path}")
+        idle_since = time.time()
+        self.keep_sessions = True
+        try:
+            # Open the sessions in download mode up front: a first task that only scrapes would
+            # otherwise start Chrome without the performance log the later downloads need
+            self.start(download_mode=True)
+            while idle_exit is None or time.time() - idle_since < idle_exit:
+                claimed = task_queue.claim(worker_id, lease)
+                if not claimed:
+                    time.sleep(2)
+                    continue
+                if self._sessions and time.time() - idle_since > 300:
+                    self.check_sessions(max_session_age)
+                self._work_on(task_queue, claimed, worker_id, lease)
+                idle_since = time.time()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.keep_sessions = False
+            self.close()
+            task_queue.close()
+
+    def _work_on(self, task_queue: TaskQueue, claimed: dict, worker_id: str, lease: float):
+        task_id = claimed["task_id"]
+        print(f"[worker {worker_id}] Claimed task {task_id} of batch {claimed['batch_id']} "
+              f"(attempt {claimed['attempt']})")
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(lease / 3):
+                if not task_queue.renew(claimed, worker_id, lease):
+                    print(f"[worker {worker_id}] Lost the lease on task {task_id}.")
+                    return
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+        try:
+            results = self.run([task_id], start_date=claimed["start_date"], end_date=claimed["end_date"])
+            entry = self.journal.tasks(self.run_id).get(task_id, {})
+            if entry.get("state") != "done":
+                raise RuntimeError(entry.get("error") or "task did not complete")
+        except Exception as e:
+            print(f"[worker {worker_id}] Task {task_id} failed: {e}")
+            task_queue.fail(claimed, worker_id, str(e))
+            return
+        finally:
+            stop.set()
+
+        payload = {
+            "results": results,
+            "task_results": self.journal.tasks(self.run_id)[task_id]["results"],
+            "spans": [dict(span, worker=worker_id) for span in self.tracer.task_timings()],
+            "validations": self.validations,
         }
+        if not task_queue.complete(claimed, worker_id, payload):
+            print(f"[worker {worker_id}] Lease on task {task_id} expired before it finished; result discarded.")
+
+    def coordinate(self, queue_path: str, selected_tasks: list | None = None, start_date: str | None = None,
+                   end_date: str | None = None, timeout: float | None = None, poll: float = 5.0) -> dict:
+        """Queue tasks for workers, wait for them and merge their results, timings and validations here.
+
+        The merged state feeds save_results_to_excel exactly like a local run() would.
+        """
+        task_queue = TaskQueue(queue_path)
+        selected_tasks = selected_tasks or list(self.tasks_config())
+        batch_id = task_queue.submit(selected_tasks, start_date, end_date)
+        print(f"[coordinator] Queued batch {batch_id} with {len(selected_tasks)} tasks in {queue_path}")
+        self.tracer = RunTracer(batch_id)
+        self.validations = []
+        deadline = time.time() + timeout if timeout else None
+        try:
+            with self.tracer.span("run"):
+                while True:
+                    rows = task_queue.batch(batch_id)
+                    pending = [row["task_id"] for row in rows if row["state"] in ("queued", "leased")]
+                    if not pending:
+                        break
+                    if deadline and time.time() > deadline:
+                        print(f"[coordinator] Timed out waiting for tasks: {', '.join(pending)}")
+                        task_queue.cancel(batch_id)
+                        rows = task_queue.batch(batch_id)
+                        break
+                    time.sleep(poll)
+
+            all_results, task_of = {}, {}
+            for row in rows:
+                if row["state"] != "done":
+                    print(f"[coordinator] Task {row['task_id']} {row['state']}"
+                          f"{': ' + row['error'] if row['error'] else ''}")
+                    continue
+                payload = row["results"]
+                all_results.update(payload["results"])
+                task_of.update({key: row["task_id"] for key in payload["task_results"]})
+                # Worker spans join the batch's metrics; each worker's own run id is kept alongside
+                self.tracer.spans.extend(dict(span, run_id=batch_id, worker_run_id=span["run_id"])
+                                         for span in payload["spans"])
+                self.validations.extend(payload["validations"])
+            self.run_id = batch_id
+            self._record_metrics(batch_id, all_results, task_of, (start_date, end_date) if start_date else None)
+            return all_results
+        finally:
+            task_queue.close()
+            try:
+                self.tracer.export(self.download_dir)
+            except OSError as e:
+                print(f"Warning: Could not write run metrics. Error: {e}")
 
     # ========== Public Runner ==========
-    def run(self, selected_tasks: list) -> dict:
-        self._vpn("connect", wait=10)
-        all_results = {}
-        
+    def run(self, selected_tasks: list | None = None, resume: bool = False,
+            start_date: str | None = None, end_date: str | None = None) -> dict:
+        """Run the selected tasks; with resume, continue the last interrupted run instead of starting over.
+
+        start_date/end_date (YYYY-MM-DD) replace the previous-month period of the download reports.
+        Open sessions from start() are reused and left open; otherwise they are opened and closed here.
+        """
+        if bool(start_date) != bool(end_date):
+            raise ValueError("start_date and end_date must be given together")
+        previous = self.journal.unfinished_run() if resume else None
+        if previous:
+            print(f"Resuming interrupted run {previous}…")
+            if selected_tasks is None:
+                selected_tasks = sorted(self.journal.tasks(previous), key=int)
+        tasks = self.tasks_config()
+        if selected_tasks is None:
+            selected_tasks = list(tasks)
+        selected_tasks = [task_id for task_id in selected_tasks if task_id in tasks]
+        self.run_id = self.journal.start_run(selected_tasks, previous)
+        self.tracer = RunTracer(self.run_id)
+        self.period = (start_date, end_date) if start_date else None
+        self.validations = []
+        self._expected_rows.clear()
+        if self.parquet or self.validate:
+            self._postprocess = ProcessPoolExecutor(max_workers=self.postprocess_workers)
         try:
-            # Determine if we need download capabilities
-            tasks = self.tasks_config()
-            needs_download = any(tasks[task_id]["type"] == "download" for task_id in selected_tasks)
-            
-            self._make_driver(download_mode=needs_download)
-            self._login()
-            
-            # Execute selected tasks
-            for task_id in selected_tasks:
-                if task_id in tasks:
-                    task = tasks[task_id]
-                    print(f"\n--- Executing: {task['name']} ---")
-                    try:
-                        results = task["method"]()
-                        all_results.update(results)
-                    except Exception as e:
-                        print(f"Error in {task['name']}: {e}")
-                        # Continue with other tasks
-            
+            with self.tracer.span("run"):
+                results = self._run(selected_tasks, previous)
+                if self._postprocessing:
+                    with self.tracer.span("postprocess", files=len(self._postprocessing)):
+                        results.update(self._collect_postprocess())
+                task_of = {key: task_id for task_id, entry in self.journal.tasks(self.run_id).items()
+                           if entry["state"] == "done" for key in entry["results"]}
+                self._record_metrics(self.run_id, results, task_of)
+                return results
+        finally:
+            if self._postprocess:
+                self._postprocess.shutdown(cancel_futures=True)
+                self._postprocess = None
+            self.period = None
+            if self.run_id:
+                self.journal.finish_run(self.run_id)
+            try:
+                self.tracer.export(self.download_dir)
+                self.waits.save()
+            except OSError as e:
+                print(f"Warning: Could not write run metrics. Error: {e}")
+
+    def _run(self, selected_tasks: list, resume_run: str | None = None) -> dict:
+        tasks = self.tasks_config()
+        if resume_run:
+            self._adopt_downloads()
+
+        # Finished tasks and reports already on disk need no browser at all
+        all_results, selected_tasks = self._resolve_offline(selected_tasks)
+        if not selected_tasks:
+            return all_results
+
+        # Determine if we need download capabilities
+        needs_download = any(tasks[task_id]["type"] == "download" for task_id in selected_tasks)
+        steps = self._plan(selected_tasks)
+        warm = bool(self._sessions)
+        try:
+            if not warm:
+                self.start(download_mode=needs_download, size=min(self.pool_size, len(steps)))
+            all_results.update(self._execute_steps(steps, needs_download))
             return all_results
-            
         finally:
-            if self.driver:
-                print("\nClosing browser…")
-                self.driver.quit()
-            self._vpn("disconnect")
+            if not warm and not self.keep_sessions:
+                self.close()
 
 
-# ==================== MAIN EXECUTION ====================
-if __name__ == "__main__":
-    automation = UnifiedAutomation(
-        login_url="https://metabase.caradvise.com/auth/login",
-        login_id= input("Enter the Login ID : "),
-        password= input("Enter the Password : "),
-        use_vpn=True,
+# ==================== DAEMON ====================
+class AutomationDaemon:
+    """Keep an automation's browser sessions warm and run jobs from a local HTTP API.
+
+    Jobs run one at a time on a single thread, which also runs due schedules and,
+    whenever it has been idle for health_interval seconds, health-checks the sessions.
+
+    API (JSON, bound to localhost):
+        POST /jobs          {"tasks": ["1", "3"], "start_date": "2024-01-01", "end_date": "2024-01-31",
+                             "resume": false, "wait": false} -> 202 with the job, or 200 once done with "wait"
+        GET  /jobs/<id>     job status, results and error
+        GET  /jobs          recent jobs
+        GET  /health        open sessions, queue length and the last health check
+        POST /shutdown      finish the running job, close the browsers and stop
+
+    Schedules are dicts with "tasks" and either "every" (seconds) or "at" ("HH:MM", daily).
+    """
+
+    def __init__(self, automation: UnifiedAutomation, host: str = "127.0.0.1", port: int = 8765,
+                 schedules: list | None = None, health_interval: float = 300, max_session_age: float = 4 * 3600,
+                 keep_jobs: int = 200):
+        self.automation = automation
+        self.health_interval = health_interval
+        self.max_session_age = max_session_age
+        self.keep_jobs = keep_jobs
+        self.schedules = [dict(schedule, next_run=self._next_run(schedule)) for schedule in schedules or []]
+        self.jobs = {}
+        self.last_health = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        from http.server import ThreadingHTTPServer  # only the daemon needs an HTTP server
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # ========== Jobs ==========
+    def submit(self, tasks: list | None = None, start_date: str | None = None, end_date: str | None = None,
+               resume: bool = False, source: str = "api") -> dict:
+        known = self.automation.tasks_config()
+        if tasks is not None:
+            unknown = [task_id for task_id in tasks if task_id not in known]
+            if unknown:
+                raise ValueError(f"Unknown task ids: {', '.join(unknown)}")
+        if bool(start_date) != bool(end_date):
+            raise ValueError("start_date and end_date must be given together")
+        for date in filter(None, (start_date, end_date)):
+            datetime.strptime(date, "%Y-%m-%d")
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "source": source,
+            "tasks": tasks,
+            "start_date": start_date,
+            "end_date": end_date,
+            "resume": resume,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "results": None,
+            "error": None,
+            "done": threading.Event(),
+        }
+        with self._lock:
+            self.jobs[job["id"]] = job
+            for old_id in list(self.jobs)[:-self.keep_jobs]:
+                if self.jobs[old_id]["finished_at"]:
+                    del self.jobs[old_id]
+        self._queue.put(job)
+        print(f"[daemon] Queued job {job['id']} ({source}): tasks {tasks or 'all'}")
+        return job
+
+    @staticmethod
+    def public(job: dict) -> dict:
+        return {key: value for key, value in job.items() if key != "done"}
+
+    def _execute(self, job: dict):
+        job["status"], job["started_at"] = "running", time.time()
+        try:
+            job["results"] = self.automation.run(job["tasks"], resume=job["resume"],
+                                                 start_date=job["start_date"], end_date=job["end_date"])
+            job["status"] = "done"
+        except Exception as e:
+            print(f"[daemon] Job {job['id']} failed: {e}")
+            job["status"], job["error"] = "failed", str(e)
+        finally:
+            job["finished_at"] = time.time()
+            job["done"].set()
+
+    # ========== Schedules ==========
+    @staticmethod
+    def _next_run(schedule: dict, after: float | None = None) -> float:
+        after = after or time.time()
+        if "every" in schedule:
+            return after + float(schedule["every"])
+        hour, minute = map(int, schedule["at"].split(":"))
+        due = datetime.fromtimestamp(after).replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if due.timestamp() <= after:
+            due += timedelta(days=1)
+        return due.timestamp()
+
+    def _queue_due_schedules(self):
+        now = time.time()
+        for schedule in self.schedules:
+            if schedule["next_run"] <= now:
+                self.submit(schedule.get("tasks"), schedule.get("start_date"), schedule.get("end_date"),
+                            source="schedule")
+                schedule["next_run"] = self._next_run(schedule, now)
+
+    # ========== Health ==========
+    def _health_check(self):
+        try:
+            sessions = self.automation.check_sessions(self.max_session_age)
+            self.last_health = {"time": time.time(), "ok": True, "sessions": sessions}
+        except Exception as e:
+            print(f"[daemon] Health check failed: {e}")
+            self.last_health = {"time": time.time(), "ok": False, "error": str(e)}
+
+    # ========== Main Loop ==========
+    def serve_forever(self):
+        """Warm up the sessions, then serve the API and work the job queue until shutdown"""
+        print("[daemon] Starting browser sessions…")
+        self.automation.start(download_mode=True)
+        server_thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        server_thread.start()
+        print(f"[daemon] Listening on {self.url}")
+        last_check = time.time()
+        try:
+            while not self._stop.is_set():
+                self._queue_due_schedules()
+                wait = min([self.health_interval] + [s["next_run"] - time.time() for s in self.schedules])
+                try:
+                    job = self._queue.get(timeout=max(1.0, wait))
+                except queue.Empty:
+                    job = None
+                if job is not None:
+                    self._execute(job)
+                elif time.time() - last_check >= self.health_interval:
+                    self._health_check()
+                    last_check = time.time()
+        finally:
+            self._server.shutdown()
+            self._server.server_close()
+            self.automation.close()
+            print("[daemon] Stopped.")
+
+    def shutdown(self):
+        self._stop.set()
+        self._queue.put(None)
+
+    def _handler(self):
+        from http.server import BaseHTTPRequestHandler
+
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload):
+                body = json.dumps(payload, default=str).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split("?")[0].rstrip("/")
+                if path == "/health":
+                    return self._send(200, {
+                        "sessions": len(daemon.automation._sessions),
+                        "queued": daemon._queue.qsize(),
+                        "last_check": daemon.last_health,
+                        "schedules": daemon.schedules,
+                    })
+                if path == "/jobs":
+                    with daemon._lock:
+                        jobs = [daemon.public(job) for job in daemon.jobs.values()]
+                    return self._send(200, jobs)
+                match = re.fullmatch(r"/jobs/(\w+)", path)
+                if match and match.group(1) in daemon.jobs:
+                    return self._send(200, daemon.public(daemon.jobs[match.group(1)]))
+                return self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                path = self.path.split("?")[0].rstrip("/")
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                except ValueError:
+                    return self._send(400, {"error": "body must be JSON"})
+                if not isinstance(body, dict):
+                    return self._send(400, {"error": "body must be a JSON object"})
+                if path == "/shutdown":
+                    daemon.shutdown()
+                    return self._send(202, {"status": "stopping"})
+                if path != "/jobs":
+                    return self._send(404, {"error": "not found"})
+                tasks = body.get("tasks")
+                if tasks is not None and not isinstance(tasks, list):
+                    return self._send(400, {"error": "tasks must be a list of task ids"})
+                try:
+                    job = daemon.submit([str(t) for t in tasks] if tasks is not None else None,
+                                        body.get("start_date"), body.get("end_date"), bool(body.get("resume")))
+                except ValueError as e:
+                    return self._send(400, {"error": str(e)})
+                if body.get("wait"):
+                    job["done"].wait()
+                    return self._send(200, daemon.public(job))
+                return self._send(202, daemon.public(job))
+
+        return Handler
+
+
+# ==================== COMMAND LINE ====================
+LOGIN_URL = "https://metabase.caradvise.com/auth/login"
+
+# Modules that must stay out of a bare import; they load on the code paths that use them
+LAZY_MODULES = ("selenium.webdriver", "requests", "pandas", "openpyxl", "pyarrow", "cryptography", "dateutil",
+                "http.server")
+
+
+def check_import_time(budget: float = 0.3) -> bool:
+    """Import this module in a fresh interpreter and compare the time against budget (seconds)"""
+    probe = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import Combined_Web_Process\n"
+        "elapsed = time.perf_counter() - started\n"
+        f"print(json.dumps([elapsed, [m for m in {LAZY_MODULES!r} if m in sys.modules]]))\n"
     )
+    output = subprocess.run([sys.executable, "-c", probe], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True).stdout
+    elapsed, loaded = json.loads(output.strip().splitlines()[-1])
+    print(f"[import] {elapsed * 1000:.0f} ms (budget {budget * 1000:.0f} ms)")
+    if loaded:
+        print(f"[import] Loaded eagerly: {', '.join(loaded)}")
+    return elapsed <= budget and not loaded
+
+
+def _date_arg(value: str) -> str:
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+    return value
+
+
+def _schedule_arg(value: str) -> dict:
+    """TASKS@HH:MM runs daily at that time, TASKS@SECONDS every that many seconds (e.g. 3,4@06:00, 5@3600)"""
+    tasks, _, when = value.partition("@")
+    task_ids = [t.strip() for t in tasks.split(",") if t.strip()]
+    unknown = [t for t in task_ids if t not in UnifiedAutomation.TASK_NAMES]
+    if not task_ids or unknown:
+        raise argparse.ArgumentTypeError(f"expected TASKS@HH:MM or TASKS@SECONDS with known task ids, got {value!r}")
+    try:
+        if ":" in when:
+            datetime.strptime(when, "%H:%M")
+            return {"tasks": task_ids, "at": when}
+        if float(when) > 0:
+            return {"tasks": task_ids, "every": float(when)}
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"expected TASKS@HH:MM or TASKS@SECONDS, got {value!r}")
+
+
+def _load_credentials(args) -> tuple:
+    """Login ID and password from --credentials-file, then the environment, then a prompt"""
+    login_id = os.environ.get("METABASE_LOGIN_ID")
+    password = os.environ.get("METABASE_PASSWORD")
+    if args.credentials_file:
+        with open(args.credentials_file, encoding="utf-8") as f:
+            stored = json.load(f)
+        login_id, password = stored.get("login_id", login_id), stored.get("password", password)
+    if not (login_id and password) and not sys.stdin.isatty():
+        raise SystemExit("No credentials: set METABASE_LOGIN_ID/METABASE_PASSWORD or pass --credentials-file")
+    login_id = login_id or input("Enter the Login ID : ")
+    password = password or getpass.getpass("Enter the Password : ")
+    return login_id, password
+
+
+def _choose_tasks(automation: UnifiedAutomation) -> tuple:
+    """Interactive menu used when no tasks were given on the command line"""
+    resume = False
+    selected = None
+    # Offer to pick up an interrupted run before showing the menu
+    if automation.journal.unfinished_run():
+        resume = input("\nThe previous run did not finish. Resume it? [Y/n]: ").strip().lower() != "n"
 
-    # Show menu
     tasks = automation.tasks_config()
-    print("\n" + "="*50)
-    print("Complete Web Scraping")
-    print("="*50)
-    print("\nAvailable tasks:")
-    for task_id, task in tasks.items():
-        print(f"{task_id}. {task['name']}")
-    
-    print("\nEnter task numbers separated by commas (e.g., 1,3,5)")
-    print("Or press Enter to run ALL tasks")
-    choice = input("\nYour selection: ").strip()
-    
-    if not choice:
-        selected = list(tasks.keys())
-        print("\nRunning ALL tasks...")
-    else:
-        selected = [t.strip() for t in choice.split(",") if t.strip() in tasks]
-        if not selected:
-            print("No valid selection. Exiting.")
-            exit(1)
-    
+    if not resume:
+        print("\n" + "="*50)
+        print("Complete Web Scraping")
+        print("="*50)
+        print("\nAvailable tasks:")
+        for task_id, task in tasks.items():
+            print(f"{task_id}. {task['name']}")
+
+        print("\nEnter task numbers separated by commas (e.g., 1,3,5)")
+        print("Or press Enter to run ALL tasks")
+        choice = input("\nYour selection: ").strip()
+
+        if not choice:
+            selected = list(tasks.keys())
+            print("\nRunning ALL tasks...")
+        else:
+            selected = [t.strip() for t in choice.split(",") if t.strip() in tasks]
+            if not selected:
+                print("No valid selection. Exiting.")
+                raise SystemExit(1)
+    return selected, resume
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Download and scrape the partner reports from Metabase")
+    select_group = parser.add_argument_group("task selection")
+    select_group.add_argument("--tasks", help="Comma-separated task ids (e.g. 1,3,5); without it a menu is shown")
+    select_group.add_argument("--all", action="store_true", help="Run every task")
+    select_group.add_argument("--resume", action="store_true", help="Continue the last interrupted run")
+    select_group.add_argument("--list", action="store_true", help="List the tasks and exit")
+    select_group.add_argument("--start-date", type=_date_arg, help="Report period start (YYYY-MM-DD)")
+    select_group.add_argument("--end-date", type=_date_arg, help="Report period end (YYYY-MM-DD)")
+
+    output_group = parser.add_argument_group("output")
+    output_group.add_argument("--output-dir", help="Download directory (default: next to this script)")
+    output_group.add_argument("--format", choices=["xlsx", "csv"], default="xlsx",
+                              help="Export format of HTTP-engine downloads")
+    output_group.add_argument("--engine", choices=["browser", "http"], default="browser")
+    output_group.add_argument("--parquet", action="store_true", help="Also convert reports to Parquet")
+    output_group.add_argument("--shard-days", type=int, help="Split download periods into shards of N days")
+    output_group.add_argument("--force-refresh", action="store_true", help="Ignore cached reports")
+    output_group.add_argument("--summary", default="automation_summary.xlsx", help="Summary workbook name")
+    output_group.add_argument("--json", action="store_true", help="Print the results as JSON")
+
+    connection_group = parser.add_argument_group("connection")
+    connection_group.add_argument("--login-url", default=LOGIN_URL)
+    connection_group.add_argument("--credentials-file",
+                                  help='JSON file with "login_id" and "password" (else METABASE_LOGIN_ID/'
+                                       'METABASE_PASSWORD, else a prompt)')
+    connection_group.add_argument("--no-vpn", action="store_true", help="Do not start the VPN")
+    connection_group.add_argument("--pool-size", type=int, default=1, help="Parallel browser sessions")
+
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument("--daemon", action="store_true", help="Keep sessions warm and serve the job API")
+    mode_group.add_argument("--worker", metavar="QUEUE", help="Run tasks claimed from a shared queue file")
+    mode_group.add_argument("--coordinate", metavar="QUEUE", help="Hand the tasks to the workers of a queue file")
+    mode_group.add_argument("--check-import-time", nargs="?", type=float, const=0.3, metavar="SECONDS",
+                            help="Check that importing this module stays within budget (default 0.3s)")
+    parser.add_argument("--port", type=int, default=8765, help="Daemon API port")
+    parser.add_argument("--schedule", type=_schedule_arg, action="append", metavar="TASKS@WHEN",
+                        help="Daemon recurring run: 3,4@06:00 daily, 5@3600 every hour; repeatable")
+    return parser
+
+
+def main(argv: list | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.check_import_time is not None:
+        return 0 if check_import_time(args.check_import_time) else 1
+    if args.list:
+        for task_id, name in UnifiedAutomation.TASK_NAMES.items():
+            print(f"{task_id}. {name}")
+        return 0
+    if bool(args.start_date) != bool(args.end_date):
+        raise SystemExit("--start-date and --end-date must be given together")
+    if args.schedule and not args.daemon:
+        raise SystemExit("--schedule only applies to --daemon")
+
+    # Settle the task selection before credentials, so a bad id never opens the journal or metrics files
+    resume = args.resume
+    selected = None
+    if args.tasks:
+        selected = [t.strip() for t in args.tasks.split(",") if t.strip()]
+        unknown = [t for t in selected if t not in UnifiedAutomation.TASK_NAMES]
+        if unknown:
+            raise SystemExit(f"Unknown task ids: {', '.join(unknown)} (see --list)")
+    elif args.all:
+        selected = list(UnifiedAutomation.TASK_NAMES)
+    elif not (resume or args.daemon or args.worker) and not sys.stdin.isatty():
+        raise SystemExit("No tasks selected: pass --tasks, --all or --resume")
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    options = dict(
+        login_url=args.login_url,
+        download_dir=args.output_dir,
+        pool_size=args.pool_size,
+        export_engine=args.engine,
+        export_format=args.format,
+        force_refresh=args.force_refresh,
+        shard_days=args.shard_days,
+        parquet=args.parquet,
+    )
+
+    login_id, password = _load_credentials(args)
+    automation = UnifiedAutomation(login_id=login_id, password=password, use_vpn=not args.no_vpn, **options)
+
+    # Daemon mode: keep the browsers warm and take jobs over the local API instead of the menu
+    if args.daemon:
+        AutomationDaemon(automation, port=args.port, schedules=args.schedule).serve_forever()
+        return 0
+
+    # Worker mode: run tasks claimed from a shared queue file until interrupted
+    if args.worker:
+        automation.work(args.worker)
+        return 0
+
+    if selected is None and not resume:
+        selected, resume = _choose_tasks(automation)
+
     try:
-        results = automation.run(selected)
+        if args.coordinate:
+            # Hand the selected tasks to the workers sharing this queue file
+            results = automation.coordinate(args.coordinate, selected, args.start_date, args.end_date)
+        else:
+            results = automation.run(selected, resume=resume, start_date=args.start_date, end_date=args.end_date)
         if results:
-            excel_path = automation.save_results_to_excel(results)
-        
+            automation.save_results_to_excel(filename=args.summary)
+
+        if args.json:
+            print(json.dumps(results, indent=2, default=str))
+            return 0
+
         print("\n" + "="*50)
         print("RESULTS")
         print("="*50)
@@ -543,4 +3124,11 @@ if __name__ == "__main__":
                 
     except Exception as e:
         print(f"\n--- AUTOMATION FAILED ---")
-        print(f"Error: {e}")
\ No newline at end of file
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+# ==================== MAIN EXECUTION ====================
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+"""Offline benchmark for UnifiedAutomation against a local stand-in Metabase server.
+
+The stand-in serves the DOM hooks the automation relies on (svg.Icon-download,
+svg.Icon-xlsx menu buttons, ScalarValue cards, "Showing N rows") and streams xlsx
+exports with configurable size, server delay and .crdownload duration. Every run
+reports end-to-end latency, throughput, CPU time and filesystem stat-call counts,
+so framework changes can be compared without real Metabase latency in the way.
+
+Example:
+    python benchmark.py --tasks 1,2,3,5 --rows 20000 --export-delay 1 --repeat 3 --json before.json
+"""
+import argparse
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+from openpyxl import Workbook
+
+from Combined_Web_Process import UnifiedAutomation
+
+
+# ==================== MOCK METABASE ====================
+LOGIN_PAGE = """<html><body>
+<form method="post" action="/auth/login">
+  <input name="username"><input name="password" type="password">
+  <button type="submit">Sign in</button>
+</form>
+</body></html>"""
+
+QUESTION_PAGE = """<html><body>
+<div id="root">Loading…</div>
+<script>
+setTimeout(() => {{
+  document.getElementById("root").innerHTML = `
+    <span>Showing {rows} rows</span>
+    <a id="download"><svg class="Icon-download" width="16" height="16"><rect width="16" height="16"></rect></svg></a>
+    <div id="menu" style="display:none">
+      <button class="text-white-hover bg-brand-hover"><svg class="Icon-csv" width="16" height="16"></svg>.csv</button>
+      <button class="text-white-hover bg-brand-hover" id="xlsx"><svg class="Icon-xlsx" width="16" height="16"></svg>.xlsx</button>
+    </div>`;
+  document.getElementById("download").onclick = () => {{ document.getElementById("menu").style.display = "block"; }};
+  document.getElementById("xlsx").onclick = () => {{ window.location.href = "/export/{card_id}.xlsx"; }};
+}}, {render_ms});
+</script>
+</body></html>"""
+
+DASHBOARD_PAGE = """<html><body>
+<div id="root"><div class="LoadingSpinner">Loading…</div></div>
+<script>
+setTimeout(() => {{ document.getElementById("root").innerHTML = `{cards}`; }}, {render_ms});
+</script>
+</body></html>"""
+
+# Filters the report URLs pass; the card metadata declares them so the HTTP engine can map them
+PARAMETERS = ["ApptStartDate", "ApptEndDate", "EnrolledStart", "EnrolledEnd", "Affiliate"]
+
+CARD = """<div class="DashCard"><div class="Card"><div class="Card-title"><div>{title}</div></div>
+<h1 class="ScalarValue">{value}</h1></div></div>"""
+
+
+class MockMetabase:
+    """Threaded local HTTP stand-in for the parts of Metabase the automation touches"""
+
+    def __init__(self, rows=5000, render_delay=0.5, export_delay=0.5, crdownload_seconds=1.0,
+                 cards=None, port=0, parameters=None):
+        self.rows = rows
+        self.parameters = PARAMETERS if parameters is None else parameters
+        self.exports = []
+        self.render_delay = render_delay
+        self.export_delay = export_delay
+        self.crdownload_seconds = crdownload_seconds
+        self.cards = cards or {"Premium Memberships": "1,234", "Elite Memberships": "567",
+                               "Paid Memberships": "8,910"}
+        self.session = "mock-session"
+        self.bytes_served = 0
+        self._xlsx = None
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def xlsx_bytes(self) -> bytes:
+        with self._lock:
+            if self._xlsx is None:
+                wb = Workbook(write_only=True)
+                ws = wb.create_sheet("Query result")
+                ws.append(["ID", "Created At", "Affiliate", "Amount", "Status"])
+                for i in range(self.rows):
+                    ws.append([i, f"2024-01-{i % 28 + 1:02d}", f"Affiliate {i % 7}", i * 1.25, "complete"])
+                buffer = io.BytesIO()
+                wb.save(buffer)
+                self._xlsx = buffer.getvalue()
+            return self._xlsx
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _logged_in(self):
+                return f"metabase.SESSION={mock.session}" in (self.headers.get("Cookie") or "")
+
+            def _stream_export(self, card_id, extension="xlsx"):
+                time.sleep(mock.export_delay)
+                body = mock.xlsx_bytes()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Content-Disposition",
+                                 f'attachment; filename="query_result_{card_id}_{time.time_ns()}.{extension}"')
+                self.end_headers()
+                # Spread the body over crdownload_seconds so Chrome keeps its temp file around
+                chunks = max(1, int(mock.crdownload_seconds * 10))
+                size = -(-len(body) // chunks)
+                for start in range(0, len(body), size):
+                    self.wfile.write(body[start:start + size])
+                    self.wfile.flush()
+                    time.sleep(mock.crdownload_seconds / chunks)
+                with mock._lock:
+                    mock.bytes_served += len(body)
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/auth/login":
+                    return self._send(200, LOGIN_PAGE.encode())
+                if path == "/":
+                    return self._send(200, b"<html><body>Home</body></html>")
+                if path == "/api/user/current":
+                    return self._send(200 if self._logged_in() else 401, b"{}", "application/json")
+                match = re.fullmatch(r"/api/card/(\d+)", path)
+                if match:
+                    card = {"id": int(match.group(1)),
+                            "parameters": [{"slug": slug, "type": "date/single" if "Start" in slug or "End" in slug
+                                            else "category", "target": ["variable", ["template-tag", slug]]}
+                                           for slug in mock.parameters]}
+                    return self._send(200, json.dumps(card).encode(), "application/json")
+                match = re.fullmatch(r"/question/(\d+)", path)
+                if match:
+                    page = QUESTION_PAGE.format(rows=mock.rows, card_id=match.group(1),
+                                                render_ms=int(mock.render_delay * 1000))
+                    return self._send(200, page.encode())
+                match = re.fullmatch(r"/export/(\d+)\.xlsx", path)
+                if match:
+                    return self._stream_export(match.group(1))
+                if re.fullmatch(r"/dashboard/\d+", path):
+                    cards = "".join(CARD.format(title=t, value=v) for t, v in mock.cards.items())
+                    page = DASHBOARD_PAGE.format(cards=cards, render_ms=int(mock.render_delay * 1000))
+                    return self._send(200, page.encode())
+                return self._send(404, b"not found")
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                path = self.path.split("?")[0]
+                if path == "/auth/login":
+                    return self._send(302, headers={
+                        "Location": "/",
+                        "Set-Cookie": f"metabase.SESSION={mock.session}; Path=/; HttpOnly",
+                    })
+                match = re.fullmatch(r"/api/card/(\d+)/query/(xlsx|csv)", path)
+                if match and self._logged_in():
+                    form = parse_qs(body.decode())
+                    with mock._lock:
+                        mock.exports.append({"card_id": int(match.group(1)),
+                                             "parameters": json.loads(form.get("parameters", ["[]"])[0])})
+                    return self._stream_export(match.group(1), match.group(2))
+                return self._send(401 if match else 404, b"")
+
+        return Handler
+
+
+# ==================== MEASUREMENT ====================
+class StatCounter:
+    """Count filesystem metadata calls made by this process while active"""
+
+    NAMES = ("stat", "lstat", "listdir", "scandir")
+
+    def __init__(self):
+        self.counts = {name: 0 for name in self.NAMES}
+        self._originals = {}
+        self._lock = threading.Lock()
+
+    def _wrap(self, name, original):
+        def counted(*args, **kwargs):
+            with self._lock:
+                self.counts[name] += 1
+            return original(*args, **kwargs)
+        return counted
+
+    def __enter__(self):
+        for name in self.NAMES:
+            self._originals[name] = getattr(os, name)
+            setattr(os, name, self._wrap(name, self._originals[name]))
+        return self
+
+    def __exit__(self, *exc):
+        for name, original in self._originals.items():
+            setattr(os, name, original)
+
+
+def run_once(mock: MockMetabase, tasks: list, args) -> dict:
+    download_dir = tempfile.mkdtemp(prefix="bench_")
+    automation = UnifiedAutomation(
+        login_url=f"{mock.url}/auth/login",
+        login_id="bench",
+        password="bench",
+        use_vpn=False,
+        download_dir=download_dir,
+        pool_size=args.pool_size,
+        export_engine=args.engine,
+        session_cache=False,
+        performance_profile=True,
+        metabase_url=mock.url,
+    )
+    served_before = mock.bytes_served
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+    with StatCounter() as stats:
+        results = automation.run(tasks)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_before
+
+    downloaded = sum(os.path.getsize(v) for v in results.values() if isinstance(v, str) and os.path.isfile(v))
+    phases = {}
+    for span in automation.tracer.spans:
+        phases[span["phase"]] = round(phases.get(span["phase"], 0) + span["duration"], 3)
+    shutil.rmtree(download_dir, ignore_errors=True)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "cpu_s": round(cpu, 3),
+        "bytes_downloaded": downloaded,
+        "bytes_served": mock.bytes_served - served_before,
+        "throughput_mb_s": round(downloaded / elapsed / 1e6, 3) if elapsed else 0.0,
+        "tasks_per_min": round(len(tasks) / elapsed * 60, 2) if elapsed else 0.0,
+        "results": len(results),
+        "stat_calls": dict(stats.counts),
+        "phases_s": phases,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark UnifiedAutomation against a local mock Metabase")
+    parser.add_argument("--tasks", default="1,2,3,4,5,6,7", help="Comma-separated task ids")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=5000, help="Rows per exported xlsx")
+    parser.add_argument("--render-delay", type=float, default=0.5, help="Seconds before a page renders")
+    parser.add_argument("--export-delay", type=float, default=0.5, help="Seconds before an export starts")
+    parser.add_argument("--crdownload-seconds", type=float, default=1.0, help="Seconds an export takes to stream")
+    parser.add_argument("--engine", choices=["browser", "http"], default="browser")
+    parser.add_argument("--pool-size", type=int, default=1)
+    parser.add_argument("--json", help="Write the per-run measurements to this file")
+    args = parser.parse_args()
+
+    tasks = [t.strip() for t in args.tasks.split(",") if t.strip()]
+    mock = MockMetabase(rows=args.rows, render_delay=args.render_delay, export_delay=args.export_delay,
+                        crdownload_seconds=args.crdownload_seconds).start()
+    print(f"Mock Metabase at {mock.url} serving {len(mock.xlsx_bytes()) / 1e6:.2f} MB exports")
+
+    runs = []
+    try:
+        for i in range(args.repeat):
+            print(f"\n=== Run {i + 1}/{args.repeat} ===")
+            runs.append(run_once(mock, tasks, args))
+    finally:
+        mock.stop()
+
+    print("\n" + "=" * 50)
+    print("BENCHMARK")
+    print("=" * 50)
+    for i, run in enumerate(runs, 1):
+        stats = ", ".join(f"{k}={v}" for k, v in run["stat_calls"].items())
+        print(f"Run {i}: {run['elapsed_s']:.2f}s wall, {run['cpu_s']:.2f}s CPU, "
+              f"{run['throughput_mb_s']:.2f} MB/s, {run['tasks_per_min']:.1f} tasks/min, {stats}")
+    elapsed = sorted(run["elapsed_s"] for run in runs)
+    print(f"\nMedian wall time: {elapsed[len(elapsed) // 2]:.2f}s over {len(runs)} runs")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "runs": runs}, f, indent=2)
+        print(f"Measurements saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# The modules under test live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_automation(tmp_path):
+    """Factory for an offline UnifiedAutomation in tmp_path; keyword arguments override the defaults"""
+    from Combined_Web_Process import UnifiedAutomation
+
+    def make(**overrides):
+        options = dict(login_url="https://metabase.example/auth/login", login_id="user", password="secret",
+                       use_vpn=False, download_dir=str(tmp_path), session_cache=False)
+        options.update(overrides)
+        return UnifiedAutomation(**options)
+    return make
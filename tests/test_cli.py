@@ -0,0 +1,42 @@
+"""Command-line entry point."""
+import pytest
+
+from Combined_Web_Process import UnifiedAutomation, build_parser, main
+
+
+def test_list_prints_tasks_without_touching_the_output_dir(tmp_path, capsys):
+    output_dir = tmp_path / "out"
+
+    assert main(["--list", "--output-dir", str(output_dir)]) == 0
+
+    printed = capsys.readouterr().out.splitlines()
+    assert printed == [f"{task_id}. {name}" for task_id, name in UnifiedAutomation.TASK_NAMES.items()]
+    assert not output_dir.exists()
+
+
+@pytest.mark.parametrize("argv, message", [
+    (["--tasks", "3,9"], "Unknown task ids: 9"),
+    ([], "No tasks selected"),
+])
+def test_bad_selection_fails_before_credentials_or_journal(argv, message, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("METABASE_LOGIN_ID", raising=False)
+    monkeypatch.delenv("METABASE_PASSWORD", raising=False)
+    monkeypatch.setattr("sys.stdin.isatty", lambda: False)
+
+    with pytest.raises(SystemExit, match=message):
+        main(argv + ["--output-dir", str(tmp_path / "out")])
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_schedule_option_parses_daily_and_interval_runs():
+    args = build_parser().parse_args(["--daemon", "--schedule", "3,4@06:00", "--schedule", "5@3600"])
+
+    assert args.schedule == [{"tasks": ["3", "4"], "at": "06:00"}, {"tasks": ["5"], "every": 3600.0}]
+
+
+@pytest.mark.parametrize("value", ["9@06:00", "3@25:00", "3@soon", "@3600", "3@-5"])
+def test_schedule_option_rejects_bad_values(value, capsys):
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(["--daemon", "--schedule", value])
@@ -0,0 +1,41 @@
+"""Daemon job API request validation."""
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from Combined_Web_Process import AutomationDaemon
+
+
+@pytest.fixture
+def daemon(make_automation):
+    daemon = AutomationDaemon(make_automation(), port=0)
+    # Only the API thread: jobs are queued but never run, so no browser is needed
+    threading.Thread(target=daemon._server.serve_forever, daemon=True).start()
+    yield daemon
+    daemon._server.shutdown()
+    daemon._server.server_close()
+
+
+def post(daemon, body: bytes):
+    request = urllib.request.Request(f"{daemon.url}/jobs", data=body, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize("body", [b"[1, 2]", b'{"tasks": 5}', b'{"tasks": "13"}', b"not json"])
+def test_malformed_job_requests_get_400(daemon, body):
+    status, payload = post(daemon, body)
+    assert status == 400
+    assert "error" in payload
+
+
+def test_job_request_is_queued(daemon):
+    status, payload = post(daemon, b'{"tasks": ["3", 4]}')
+    assert status == 202
+    assert payload["tasks"] == ["3", "4"]
@@ -0,0 +1,83 @@
+"""HTTP export engine against the benchmark's local stand-in Metabase."""
+import os
+
+import pytest
+import requests
+
+from benchmark import MockMetabase
+
+
+@pytest.fixture
+def mock():
+    server = MockMetabase(rows=50, render_delay=0, export_delay=0, crdownload_seconds=0.1).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def make_http_automation(make_automation):
+    """The shared factory pointed at a mock, already holding a logged-in HTTP session"""
+    def make(mock, **overrides):
+        automation = make_automation(login_url=f"{mock.url}/auth/login", login_id="test", password="test",
+                                     export_engine="http", metabase_url=mock.url, **overrides)
+        # Log in to the mock the way the browser would; the engine reuses the session's cookie
+        session = requests.Session()
+        session.post(f"{mock.url}/auth/login", data={"username": "test", "password": "test"})
+        automation.http_session = session
+        return automation
+    return make
+
+
+def test_http_export_maps_url_parameters(mock, make_http_automation):
+    automation = make_http_automation(mock)
+    try:
+        handle = automation._start_report_download(
+            f"{mock.url}/question/1764?Affiliate=Instacart%20Canada", "Enrollments",
+            "2024-01-01", "2024-01-31", "EnrolledStart", "EnrolledEnd", engine="http",
+        )
+        paths = automation._wait_for_all_downloads([handle], timeout=30)
+    finally:
+        automation._close_driver()
+
+    assert os.path.basename(paths["Enrollments"]) == "Enrollments.xlsx"
+    assert os.path.getsize(paths["Enrollments"]) == len(mock.xlsx_bytes())
+    export = mock.exports[-1]
+    assert export["card_id"] == 1764
+    values = {p["target"][1][1]: p["value"] for p in export["parameters"]}
+    assert values == {"Affiliate": ["Instacart Canada"], "EnrolledStart": "2024-01-01", "EnrolledEnd": "2024-01-31"}
+
+
+def test_http_export_rejects_unmapped_parameters(make_http_automation, tmp_path):
+    mock = MockMetabase(rows=5, export_delay=0, crdownload_seconds=0, parameters=["ApptStartDate"]).start()
+    automation = make_http_automation(mock)
+    try:
+        handle = automation._start_report_download(
+            f"{mock.url}/question/1499", "TV4", "2024-01-01", "2024-01-31", engine="http",
+        )
+        with pytest.raises(RuntimeError, match="ApptEndDate"):
+            automation._wait_for_all_downloads([handle], timeout=30)
+    finally:
+        automation._close_driver()
+        mock.stop()
+    assert mock.exports == []
+    assert not os.path.exists(tmp_path / "TV4.xlsx")
+
+
+def test_failed_export_does_not_abort_its_siblings(make_http_automation, tmp_path):
+    mock = MockMetabase(rows=50, export_delay=0, crdownload_seconds=1.0).start()
+    automation = make_http_automation(mock)
+    automation.run_id = automation.journal.start_run(["1"])
+    automation.current_task_id = "1"
+    try:
+        good = automation._start_report_download(f"{mock.url}/question/1499", "TV4", "2024-01-01", "2024-01-31",
+                                                 engine="http")
+        bad = automation._start_report_download(f"{mock.url}/question/1262?Bogus=1", "Canada", engine="http")
+        with pytest.raises(RuntimeError, match="Bogus"):
+            automation._wait_for_all_downloads([good, bad], timeout=30)
+    finally:
+        automation._close_driver()
+        mock.stop()
+
+    assert os.path.getsize(tmp_path / "TV4.xlsx") == len(mock.xlsx_bytes())
+    assert automation.journal.completed_download(automation.run_id, "TV4") == str(tmp_path / "TV4.xlsx")
+    assert automation.journal.open_downloads(automation.run_id) == []
@@ -0,0 +1,6 @@
+"""Import-time budget: the heavy dependencies must load lazily."""
+from Combined_Web_Process import check_import_time
+
+
+def test_import_stays_within_budget():
+    assert check_import_time(), "importing Combined_Web_Process is over budget or loads a dependency eagerly"
@@ -0,0 +1,18 @@
+"""Page specs: URLs rebuilt from parsed query parameters."""
+from urllib.parse import parse_qsl, urlsplit
+
+from Combined_Web_Process import UnifiedAutomation
+
+
+def test_spec_url_reencodes_parameter_values(make_automation):
+    spec = make_automation(metabase_url="https://metabase.example")._page_spec(
+        "https://metabase.example/question/1764?Affiliate=Instacart%20Canada&id=1&id=2", {"Rows": "rows"},
+        extra_params=[("date_filter", "~2024-01-01")],
+    )
+
+    url = UnifiedAutomation._spec_url(spec)
+
+    assert " " not in url
+    assert url.startswith("https://metabase.example/question/1764?")
+    assert parse_qsl(urlsplit(url).query) == [("Affiliate", "Instacart Canada"), ("id", "1"), ("id", "2"),
+                                              ("date_filter", "~2024-01-01")]
@@ -0,0 +1,54 @@
+"""Streaming xlsx -> Parquet conversion."""
+import os
+
+import pytest
+from openpyxl import Workbook
+
+from Combined_Web_Process import convert_to_parquet
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def write_report(path, rows):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Query result")
+    ws.append(["ID", "Amount", "Note"])
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+def test_later_batches_widen_the_schema(tmp_path):
+    source = tmp_path / "report.xlsx"
+    write_report(source, [[i, i, None] for i in range(10)] + [[10, 2.5, "late"]])
+
+    result = convert_to_parquet(str(source), str(tmp_path / "report.parquet"), batch_rows=4)
+
+    table = pq.read_table(result["path"])
+    assert result["rows"] == 11
+    assert str(table.schema.field("Amount").type) == "double"
+    assert str(table.schema.field("Note").type) == "string"
+    assert table.column("Amount").to_pylist()[-2:] == [9.0, 2.5]
+    assert table.column("Note").to_pylist()[-2:] == [None, "late"]
+
+
+def test_failed_conversion_leaves_no_temp_files(tmp_path):
+    source = tmp_path / "report.xlsx"
+    write_report(source, [[i, i, None] for i in range(5)] + [[5, "n/a", None]])
+
+    with pytest.raises(ValueError, match="Amount"):
+        convert_to_parquet(str(source), str(tmp_path / "report.parquet"), batch_rows=4)
+
+    assert sorted(os.listdir(tmp_path)) == ["report.xlsx"]
+
+
+def test_column_typed_as_strings_after_empty_start_keeps_later_ints(tmp_path):
+    source = tmp_path / "report.xlsx"
+    rows = [[i, i, None] for i in range(4)] + [[i, i, "x"] for i in range(4, 8)] + [[8, 8, 5]]
+    write_report(source, rows)
+
+    result = convert_to_parquet(str(source), str(tmp_path / "report.parquet"), batch_rows=4)
+
+    table = pq.read_table(result["path"])
+    assert str(table.schema.field("Note").type) == "string"
+    assert table.column("Note").to_pylist()[-2:] == ["x", "5"]
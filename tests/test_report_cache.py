@@ -0,0 +1,38 @@
+"""Report cache expiry and eviction."""
+import os
+
+from Combined_Web_Process import ReportCache
+
+
+def export(tmp_path, name, size=100):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_expired_entry_is_dropped(tmp_path):
+    cache = ReportCache(str(tmp_path / "cache"), ttl=60)
+    key = ReportCache.key("https://metabase.example/question/1499", "2024-01-01", "2024-01-31", "xlsx")
+    cached = cache.put(key, export(tmp_path, "TV4.xlsx"))
+    assert cache.get(key) == cached
+
+    cache.manifest[key]["fetched_at"] -= 61
+
+    assert cache.get(key) is None
+    assert not os.path.exists(cached)
+    assert key not in ReportCache(str(tmp_path / "cache")).manifest
+
+
+def test_least_recently_used_entry_is_evicted_over_max_bytes(tmp_path):
+    cache = ReportCache(str(tmp_path / "cache"), max_bytes=250)
+    first = cache.put("a" * 64, export(tmp_path, "a.xlsx"))
+    second = cache.put("b" * 64, export(tmp_path, "b.xlsx"))
+    # Age the second entry so it is the least recently used even within one clock tick
+    cache.manifest["b" * 64]["last_used"] -= 10
+    assert cache.get("a" * 64) == first
+
+    cache.put("c" * 64, export(tmp_path, "c.xlsx"))
+
+    assert set(cache.manifest) == {"a" * 64, "c" * 64}
+    assert not os.path.exists(second)
+    assert cache.get("a" * 64) == first
@@ -0,0 +1,23 @@
+"""Retrying failed steps."""
+
+
+def test_failed_recovery_keeps_the_first_pass_results(make_automation):
+    automation = make_automation(max_retries=2, retry_backoff=0)
+    steps = [{"task_ids": ["3"]}, {"task_ids": ["6"]}]
+    recoveries = []
+
+    def execute(batch):
+        for step in batch:
+            if step["task_ids"] == ["6"]:
+                step["error"] = "download timed out"
+        return {"Grubhub_Premium_Memberships": 1234} if len(batch) == 2 else {}
+
+    def recover():
+        recoveries.append(1)
+        raise RuntimeError("browser would not start")
+
+    results = automation._with_retries(steps, execute, recover)
+
+    assert results == {"Grubhub_Premium_Memberships": 1234}
+    assert steps[1]["error"] == "download timed out"
+    assert len(recoveries) == 2
@@ -0,0 +1,15 @@
+"""Traces and metrics of a run share the journal's run id."""
+import json
+import os
+
+
+def test_trace_uses_the_journal_run_id(make_automation, tmp_path):
+    automation = make_automation(validate=False)
+    # An empty selection needs no browser but still opens a journal run and writes its trace
+    automation.run([])
+
+    with open(os.path.join(str(tmp_path), "automation_trace.jsonl"), encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f]
+    assert spans
+    assert {span["run_id"] for span in spans} == {automation.run_id}
+    assert automation.tracer.run_id == automation.run_id
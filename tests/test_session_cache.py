@@ -0,0 +1,28 @@
+"""Encrypted session cache shared by pool workers."""
+import os
+import threading
+
+from Combined_Web_Process import SessionCache
+
+
+def test_concurrent_saves_do_not_collide(tmp_path):
+    cache = SessionCache(str(tmp_path), "https://metabase.example/auth/login", "user", "secret")
+    cookies = [{"name": SessionCache.SESSION_COOKIE, "value": "abc"}]
+    errors = []
+
+    def save():
+        for _ in range(25):
+            try:
+                cache.save(cookies)
+            except OSError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=save) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert cache.load() == cookies
+    assert [p.name for p in tmp_path.iterdir()] == [os.path.basename(cache.path)]
@@ -0,0 +1,66 @@
+"""Shard merge verification."""
+import csv
+
+import pytest
+
+from Combined_Web_Process import UnifiedAutomation, merge_report_shards
+
+REPORT = {"label": "TV4", "start_date": "2024-01-01", "end_date": "2024-01-14"}
+PARTS = [{"start_date": "2024-01-01", "end_date": "2024-01-07"},
+         {"start_date": "2024-01-08", "end_date": "2024-01-14"}]
+
+
+def write_shards(tmp_path, *shard_rows):
+    paths = []
+    for i, rows in enumerate(shard_rows, 1):
+        path = tmp_path / f"TV4_part{i}.csv"
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows([["ID", "Date"], *rows])
+        paths.append(str(path))
+    return paths
+
+
+def merge(tmp_path, *shard_rows):
+    output_path = str(tmp_path / "TV4.csv")
+    return merge_report_shards(write_shards(tmp_path, *shard_rows), output_path), output_path
+
+
+def test_tiled_distinct_shards_pass(tmp_path):
+    merged, output_path = merge(tmp_path, [["1", "2024-01-02"]], [["2", "2024-01-09"], ["3", "2024-01-10"]])
+
+    UnifiedAutomation._verify_shards(REPORT, PARTS, merged, output_path)
+    assert merged["rows"] == 3
+
+
+def test_empty_shards_are_not_duplicates(tmp_path):
+    merged, output_path = merge(tmp_path, [], [])
+
+    UnifiedAutomation._verify_shards(REPORT, PARTS, merged, output_path)
+
+
+@pytest.mark.parametrize("parts, message", [
+    ([PARTS[0], dict(PARTS[1], start_date="2024-01-09")], "gap or overlap at 2024-01-09"),
+    ([PARTS[0], dict(PARTS[1], end_date="2024-01-13")], "stop at 2024-01-13"),
+])
+def test_windows_must_tile_the_report(tmp_path, parts, message):
+    merged, output_path = merge(tmp_path, [["1", "2024-01-02"]], [["2", "2024-01-09"]])
+
+    with pytest.raises(RuntimeError, match=message):
+        UnifiedAutomation._verify_shards(REPORT, parts, merged, output_path)
+
+
+def test_identical_shards_mean_the_date_filter_was_ignored(tmp_path):
+    rows = [["1", "2024-01-02"], ["2", "2024-01-09"]]
+    merged, output_path = merge(tmp_path, rows, rows)
+
+    with pytest.raises(RuntimeError, match="duplicates 2024-01-01..2024-01-07"):
+        UnifiedAutomation._verify_shards(REPORT, PARTS, merged, output_path)
+
+
+def test_missing_shard_or_rows_fail(tmp_path):
+    merged, output_path = merge(tmp_path, [["1", "2024-01-02"]], [["2", "2024-01-09"]])
+
+    with pytest.raises(RuntimeError, match="Merged 1 of 2 shards"):
+        UnifiedAutomation._verify_shards(REPORT, PARTS, dict(merged, shards=merged["shards"][:1]), output_path)
+    with pytest.raises(RuntimeError, match="has 2 rows, expected 3"):
+        UnifiedAutomation._verify_shards(REPORT, PARTS, dict(merged, rows=3), output_path)
@@ -0,0 +1,19 @@
+"""Summary workbook rendered from the metrics store."""
+import os
+
+import pytest
+
+
+def test_legacy_results_argument_still_writes_the_summary(make_automation, tmp_path):
+    automation = make_automation()
+
+    with pytest.deprecated_call():
+        path = automation.save_results_to_excel({"Grubhub_Premium_Memberships": 1234})
+
+    assert path == os.path.join(str(tmp_path), "automation_summary.xlsx")
+    assert os.path.exists(path)
+
+
+def test_filename_by_keyword(make_automation):
+    path = make_automation().save_results_to_excel(filename="summary.xlsx")
+    assert os.path.basename(path) == "summary.xlsx"
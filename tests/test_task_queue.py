@@ -0,0 +1,57 @@
+"""Lease-based task queue shared by a coordinator and its workers."""
+import pytest
+
+from Combined_Web_Process import TaskQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = TaskQueue(str(tmp_path / "queue.sqlite3"), max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def test_expired_lease_is_claimed_again(queue):
+    batch_id = queue.submit(["3"], "2024-01-01", "2024-01-31")
+
+    # A negative lease has already run out, as if worker a had died
+    first = queue.claim("a", lease=-1)
+    second = queue.claim("b", lease=60)
+
+    assert (first["task_id"], first["attempt"]) == ("3", 1)
+    assert (second["task_id"], second["attempt"], second["start_date"]) == ("3", 2, "2024-01-01")
+    assert queue.batch(batch_id)[0]["worker"] == "b"
+
+
+def test_stale_worker_cannot_complete_a_taken_over_task(queue):
+    batch_id = queue.submit(["3"])
+    stale = queue.claim("a", lease=-1)
+    current = queue.claim("b", lease=60)
+
+    assert not queue.renew(stale, "a", 60)
+    assert not queue.complete(stale, "a", {"Grubhub_Premium_Memberships": 1})
+    assert queue.complete(current, "b", {"Grubhub_Premium_Memberships": 2})
+    [row] = queue.batch(batch_id)
+    assert (row["state"], row["results"]) == ("done", {"Grubhub_Premium_Memberships": 2})
+
+
+def test_task_fails_after_max_attempts(queue):
+    batch_id = queue.submit(["3", "4"])
+    queue.claim("a", lease=-1)
+    queue.claim("b", lease=-1)
+
+    # Both attempts at task 3 are used up, so the next claim skips to task 4
+    assert queue.claim("c", lease=60)["task_id"] == "4"
+    assert queue.batch(batch_id)[0]["state"] == "failed"
+    assert queue.batch(batch_id)[0]["error"] == "lease expired on every attempt"
+
+
+def test_failed_attempt_requeues_until_max_attempts(queue):
+    batch_id = queue.submit(["3"])
+
+    assert queue.fail(queue.claim("a", lease=60), "a", "timed out")
+    assert queue.batch(batch_id)[0]["state"] == "queued"
+    assert queue.fail(queue.claim("a", lease=60), "a", "timed out again")
+    [row] = queue.batch(batch_id)
+    assert (row["state"], row["attempts"], row["error"]) == ("failed", 2, "timed out again")
+    assert queue.claim("a", lease=60) is None
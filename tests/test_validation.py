@@ -0,0 +1,22 @@
+"""Row-count validation of downloaded reports."""
+import pytest
+from openpyxl import Workbook
+
+from Combined_Web_Process import UnifiedAutomation, postprocess_report
+
+
+def test_empty_file_is_unreadable_not_partial(tmp_path):
+    source = tmp_path / "empty.xlsx"
+    Workbook().save(source)
+
+    with pytest.raises(ValueError, match="no header row") as raised:
+        postprocess_report(str(source))
+
+    assert UnifiedAutomation._row_verdict(None, (10, False), raised.value).startswith("unreadable")
+
+
+def test_header_only_file_counts_zero_rows(tmp_path):
+    source = tmp_path / "header.csv"
+    source.write_text("ID,Amount\n", encoding="utf-8")
+
+    assert postprocess_report(str(source))["rows"] == 0